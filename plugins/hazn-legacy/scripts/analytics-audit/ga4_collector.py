@@ -5,7 +5,27 @@ Queries GA4 Data API for property config, events, conversions, traffic,
 campaigns, e-commerce, device, and geographic data.
 
 Usage:
-    python ga4_collector.py <property_id> <output_file> [--days 30]
+    python ga4_collector.py <property_id> <output_file> [--days 30] [--end-date YYYY-MM-DD]
+                            [--concurrency 4]
+                            [--extra-output <extra_file> [--extra-days 90]]
+                            [--property-only] [--refresh-properties] [--rows-dir <dir>]
+                            [--refresh-cache]
+
+Reports are sent five at a time through batchRunReports, with several
+batches in flight at once. --extra-output collects the extended dataset
+(see ga4_collector_extra.py) in the same run. Property metadata is cached
+for a day in ~/.config/ga4-audit/properties.json; --property-only skips
+the crawl of every other property the login can see.
+
+The JSON output keeps the top rows of each report. --rows-dir pages
+through the campaign and landing-page reports in full (250k rows per
+request) and streams every row to <dir>/<report>.jsonl.
+
+Report responses are cached in ~/.config/ga4-audit/reports/, keyed by the
+full request. Date ranges that end more than three days ago (see
+--end-date) are final and never re-queried; ranges touching recent days
+expire after six hours. The cache is capped at 64 MB, dropping the least
+recently used reports first. --refresh-cache re-queries everything.
 
 Prerequisites:
     pip install google-analytics-data google-auth-oauthlib
@@ -13,16 +33,21 @@ Prerequisites:
 """
 
 import argparse
+import contextlib
+import hashlib
 import json
 import os
 import sys
-from datetime import datetime, timedelta
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 from google.analytics.admin import AnalyticsAdminServiceClient
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
 from google.analytics.data_v1beta.types import (
-    DateRange, Dimension, Filter, FilterExpression,
+    BatchRunReportsRequest, DateRange, Dimension, Filter, FilterExpression,
     Metric, OrderBy, RunReportRequest
 )
 from google.oauth2.credentials import Credentials
@@ -37,6 +62,31 @@ CONFIG_DIR = Path.home() / ".config" / "ga4-audit"
 CREDS_FILE = CONFIG_DIR / "credentials.json"
 TOKEN_FILE = CONFIG_DIR / "token.json"
 
+# GA4 Data API limit on reports per batchRunReports call
+MAX_BATCH_REPORTS = 5
+# Batch calls in flight at once; standard properties allow 10 concurrent requests
+GA4_CONCURRENCY = 4
+
+# Property metadata barely changes; cache get_property() results for a day
+PROPERTY_CACHE_FILE = CONFIG_DIR / "properties.json"
+PROPERTY_CACHE_TTL = 24 * 3600
+PROPERTY_WORKERS = 8
+
+# Largest page runReport returns; full exports page through with offsets
+PAGE_SIZE = 250_000
+# Reports that are truncated in the JSON output; --rows-dir exports them in full
+FULL_EXPORTS = ("campaigns", "landing_pages")
+
+# Report responses cached on disk, keyed by a hash of the full request.
+# GA4 keeps reprocessing the last couple of days; ranges ending before the
+# lag cutoff are final and cached for good, newer ones expire after the TTL.
+REPORT_CACHE_DIR = CONFIG_DIR / "reports"
+REPORT_CACHE_TTL = 6 * 3600
+REPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PROCESSING_LAG_DAYS = 3
+# File name suffix of cached reports whose date ranges are final
+FINAL_SUFFIX = ".final.json"
+
 
 def get_credentials():
     """Get or refresh OAuth2 credentials."""
@@ -62,8 +112,9 @@ def get_credentials():
     return creds
 
 
-def run_report(client, property_id, dimensions, metrics, date_range, limit=20, order_by_metric=None):
-    """Run a GA4 report and return rows as dicts."""
+def report_request(property_id, dimensions, metrics, date_range, limit=20, order_by_metric=None,
+                   offset=0):
+    """Build the RunReportRequest for one report (limit=None: API default)."""
     dim_objs = [Dimension(name=d) for d in dimensions]
     met_objs = [Metric(name=m) for m in metrics]
     order = []
@@ -76,126 +127,434 @@ def run_report(client, property_id, dimensions, metrics, date_range, limit=20, o
         metrics=met_objs,
         date_ranges=[date_range],
         order_bys=order,
-        limit=limit,
     )
-    response = client.run_report(request)
-    rows = []
+    if limit is not None:
+        request.limit = limit
+    if offset:
+        request.offset = offset
+    return request
+
+
+def iter_response_rows(response, dimensions, metrics):
+    """Yield the rows of a report response as dicts."""
     for row in response.rows:
         entry = {}
         for i, dim in enumerate(dimensions):
             entry[dim] = row.dimension_values[i].value
         for i, met in enumerate(metrics):
             entry[met] = row.metric_values[i].value
-        rows.append(entry)
-    return rows
+        yield entry
 
 
-def collect_all(property_id, days=30):
-    """Collect all GA4 audit data."""
-    creds = get_credentials()
-    data_client = BetaAnalyticsDataClient(credentials=creds)
-    admin_client = AnalyticsAdminServiceClient(credentials=creds)
+def response_rows(response, dimensions, metrics):
+    """Rows of a report response as dicts."""
+    return list(iter_response_rows(response, dimensions, metrics))
+
+
+def iter_report_rows(client, property_id, dimensions, metrics, date_range, limit=None,
+                     order_by_metric=None, page_size=PAGE_SIZE):
+    """Yield report rows page by page, up to limit rows (None: all of them).
+
+    Pages of page_size rows are requested with increasing offsets until the
+    response's row_count is reached, so only one page is held at a time.
+    """
+    offset = 0
+    while limit is None or offset < limit:
+        size = page_size if limit is None else min(page_size, limit - offset)
+        response = client.run_report(report_request(
+            property_id, dimensions, metrics, date_range, size, order_by_metric, offset))
+        if not response.rows:
+            break
+        yield from iter_response_rows(response, dimensions, metrics)
+        offset += len(response.rows)
+        if offset >= response.row_count:
+            break
+
+
+def run_report(client, property_id, dimensions, metrics, date_range, limit=20, order_by_metric=None):
+    """Run a GA4 report and return rows as dicts (limit=None: every row, paginated)."""
+    if limit is None:
+        return list(iter_report_rows(client, property_id, dimensions, metrics, date_range,
+                                     order_by_metric=order_by_metric))
+    request = report_request(property_id, dimensions, metrics, date_range, limit, order_by_metric)
+    return response_rows(client.run_report(request), dimensions, metrics)
+
+
+def write_rows(rows, path):
+    """Stream rows to path as JSON Lines and return how many were written."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    count = 0
+    with open(tmp, "w") as out:
+        for row in rows:
+            out.write(json.dumps(row))
+            out.write("\n")
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def data_api_pool(concurrency=GA4_CONCURRENCY, pool=None):
+    """Context manager yielding pool, or a new executor of `concurrency` workers.
+
+    Data API calls run on it, so passing one pool to several callers keeps
+    their combined requests in flight within one concurrency cap.
+    """
+    if pool is not None:
+        return contextlib.nullcontext(pool)
+    return ThreadPoolExecutor(max_workers=max(1, concurrency))
+
+
+def export_reports(client, property_id, specs, rows_dir, concurrency=GA4_CONCURRENCY, pool=None):
+    """Write every row of each {key: report_spec} to rows_dir/<key>.jsonl.
+
+    The spec's limit is ignored: each report is paged through in full and
+    streamed to disk. Exports run on `pool` when given (see data_api_pool).
+    Returns {key: {"file": path, "rows": count}}.
+    """
+    def export(key):
+        spec = dict(specs[key], limit=None)
+        path = Path(rows_dir) / f"{key}.jsonl"
+        print(f"Exporting all {key} rows to {path}...")
+        return {"file": str(path), "rows": write_rows(iter_report_rows(client, property_id, **spec), path)}
+
+    with data_api_pool(concurrency, pool) as api_pool:
+        return dict(zip(specs, api_pool.map(export, specs)))
+
+
+def report_spec(dimensions, metrics, date_range, limit=20, order_by_metric=None):
+    """The arguments of one run_report() call, for run_reports()."""
+    return {
+        "dimensions": list(dimensions),
+        "metrics": list(metrics),
+        "date_range": date_range,
+        "limit": limit,
+        "order_by_metric": order_by_metric,
+    }
+
+
+def report_cache_key(request):
+    """Content address of a RunReportRequest.
+
+    Covers everything that shapes the response: property, dimensions,
+    metrics, filters, ordering, limit, offset and date ranges.
+    """
+    return hashlib.sha256(type(request).to_json(request).encode("utf-8")).hexdigest()
+
+
+def is_final_range(date_range, today=None):
+    """True if date_range ends before the processing-lag cutoff."""
+    try:
+        end = date.fromisoformat(date_range.end_date)
+    except ValueError:
+        return False  # relative dates ("today", "7daysAgo") move with the calendar
+    return end < (today or date.today()) - timedelta(days=PROCESSING_LAG_DAYS)
+
+
+def report_cache_path(request):
+    """Cache file of request; requests over final date ranges end in FINAL_SUFFIX."""
+    final = all(is_final_range(dr) for dr in request.date_ranges)
+    return REPORT_CACHE_DIR / (report_cache_key(request) + (FINAL_SUFFIX if final else ".json"))
+
+
+def load_cached_report(request, ttl=REPORT_CACHE_TTL):
+    """Cached rows for request, or None if missing or expired.
 
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
-    date_range = DateRange(
-        start_date=start_date.strftime("%Y-%m-%d"),
+    Final entries never expire; reading one bumps its mtime, so the size
+    cap in prune_report_cache() drops the least recently used first.
+    """
+    path = report_cache_path(request)
+    final = path.name.endswith(FINAL_SUFFIX)
+    try:
+        if not final and time.time() - path.stat().st_mtime >= ttl:
+            return None
+        entry = json.loads(path.read_text())
+        if final:
+            os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return entry["rows"]
+
+
+def store_cached_report(request, rows):
+    """Cache rows for request."""
+    REPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=REPORT_CACHE_DIR, suffix=".tmp", delete=False) as out:
+        json.dump({"stored_at": time.time(), "rows": rows}, out)
+    os.replace(out.name, report_cache_path(request))
+
+
+def prune_report_cache(ttl=REPORT_CACHE_TTL, max_bytes=REPORT_CACHE_MAX_BYTES):
+    """Delete expired cached reports, then the oldest ones beyond max_bytes.
+
+    Works from file names and stat() alone; no entry is read.
+    """
+    now = time.time()
+    entries = []
+    for path in REPORT_CACHE_DIR.glob("*.json"):
+        try:
+            st = path.stat()
+            if not path.name.endswith(FINAL_SUFFIX) and now - st.st_mtime >= ttl:
+                path.unlink()
+                continue
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+
+
+def plan_batches(specs, batch_size=MAX_BATCH_REPORTS):
+    """Group report keys into batchRunReports calls of at most batch_size reports."""
+    keys = list(specs)
+    return [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+
+
+def run_reports(client, property_id, specs, concurrency=GA4_CONCURRENCY, refresh_cache=False,
+                pool=None):
+    """Run {key: report_spec} through batchRunReports and return {key: rows}.
+
+    Reports are sent MAX_BATCH_REPORTS at a time instead of one call each,
+    and up to `concurrency` batch calls are in flight at once. The rows
+    come back exactly as run_report() would return them. Responses are
+    served from and saved to the report cache; refresh_cache skips the
+    lookup but still saves the new responses. Batches run on `pool` when
+    given (see data_api_pool).
+    """
+    requests = {key: report_request(property_id, **spec) for key, spec in specs.items()}
+
+    def run_batch(keys):
+        response = client.batch_run_reports(BatchRunReportsRequest(
+            property=f"properties/{property_id}",
+            requests=[requests[key] for key in keys],
+        ))
+        rows = {}
+        for key, report in zip(keys, response.reports):
+            rows[key] = response_rows(report, specs[key]["dimensions"], specs[key]["metrics"])
+            store_cached_report(requests[key], rows[key])
+        return rows
+
+    prune_report_cache()
+    results = {}
+    if not refresh_cache:
+        for key, request in requests.items():
+            rows = load_cached_report(request)
+            if rows is not None:
+                results[key] = rows
+        if results:
+            print(f"Cached: {', '.join(results)}")
+    pending = {key: spec for key, spec in specs.items() if key not in results}
+
+    with data_api_pool(concurrency, pool) as api_pool:
+        futures = []
+        for keys in plan_batches(pending):
+            print(f"Collecting {', '.join(keys)}...")
+            futures.append(api_pool.submit(run_batch, keys))
+        for future in futures:
+            results.update(future.result())
+    return {key: results[key] for key in specs}
+
+
+def parse_end_date(value):
+    """--end-date value (YYYY-MM-DD) as a datetime."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+
+def date_range_for(days, end_date=None):
+    """DateRange covering the last `days` days up to end_date (default: now)."""
+    end_date = end_date or datetime.now()
+    return DateRange(
+        start_date=(end_date - timedelta(days=days)).strftime("%Y-%m-%d"),
         end_date=end_date.strftime("%Y-%m-%d"),
     )
 
-    result = {}
 
-    # 1. Property metadata
-    print("Collecting property metadata...")
-    properties = []
+def load_property_cache(ttl=PROPERTY_CACHE_TTL):
+    """{property_id: record} from PROPERTY_CACHE_FILE, fresher than ttl seconds."""
+    try:
+        cached = json.loads(PROPERTY_CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {
+        pid: entry["property"] for pid, entry in cached.items()
+        if now - entry.get("fetched_at", 0) < ttl
+    }
+
+
+def save_property_cache(records):
+    """Merge {property_id: record} into PROPERTY_CACHE_FILE, stamped with the current time."""
+    try:
+        cached = json.loads(PROPERTY_CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        cached = {}
+    now = time.time()
+    cached.update({pid: {"fetched_at": now, "property": record} for pid, record in records.items()})
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = PROPERTY_CACHE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cached, indent=2))
+    os.replace(tmp, PROPERTY_CACHE_FILE)
+
+
+def fetch_properties(admin_client, only=None, refresh=False, workers=PROPERTY_WORKERS):
+    """Metadata of every property the login can see, or only of property `only`.
+
+    Account summaries come from one paginated call; the per-property
+    get_property() lookups run `workers` at a time, and records younger
+    than PROPERTY_CACHE_TTL are reused from disk unless refresh is set.
+    """
+    summaries = []
     for summary in admin_client.list_account_summaries():
         for prop in summary.property_summaries:
-            prop_detail = admin_client.get_property(name=prop.property)
-            properties.append({
-                "account": summary.display_name,
-                "account_id": summary.name,
-                "property": prop.display_name,
-                "property_id": prop.property.split("/")[-1],
-                "industry": str(prop_detail.industry_category),
-                "time_zone": prop_detail.time_zone,
-                "currency": prop_detail.currency_code,
-                "create_time": str(prop_detail.create_time),
-            })
-    result["properties"] = properties
-
-    # 2. Events inventory
-    print("Collecting events...")
-    result["events"] = run_report(
-        data_client, property_id,
-        ["eventName"],
-        ["eventCount", "totalUsers"],
-        date_range, limit=50, order_by_metric="eventCount"
-    )
+            property_id = prop.property.split("/")[-1]
+            if only is None or property_id == str(only):
+                summaries.append((summary, prop, property_id))
 
-    # 3. Conversions (key events)
-    print("Collecting conversions...")
-    result["conversions"] = run_report(
-        data_client, property_id,
-        ["eventName", "isKeyEvent"],
-        ["eventCount", "totalUsers", "sessionsPerUser"],
-        date_range, limit=50
-    )
+    cached = {} if refresh else load_property_cache()
+    missing = [(summary, prop) for summary, prop, pid in summaries if pid not in cached]
 
-    # 4. Traffic sources
-    print("Collecting traffic sources...")
-    result["traffic"] = run_report(
-        data_client, property_id,
-        ["sessionSource", "sessionMedium"],
-        ["sessions", "totalUsers", "engagedSessions", "engagementRate", "conversions"],
-        date_range, limit=50, order_by_metric="sessions"
-    )
+    def fetch(summary, prop):
+        prop_detail = admin_client.get_property(name=prop.property)
+        return {
+            "account": summary.display_name,
+            "account_id": summary.name,
+            "property": prop.display_name,
+            "property_id": prop.property.split("/")[-1],
+            "industry": str(prop_detail.industry_category),
+            "time_zone": prop_detail.time_zone,
+            "currency": prop_detail.currency_code,
+            "create_time": str(prop_detail.create_time),
+        }
 
-    # 5. Campaign performance
-    print("Collecting campaigns...")
-    result["campaigns"] = run_report(
-        data_client, property_id,
-        ["sessionCampaignName", "sessionSource", "sessionMedium"],
-        ["sessions", "totalUsers", "conversions", "engagementRate"],
-        date_range, limit=50, order_by_metric="sessions"
-    )
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            fetched = list(pool.map(lambda args: fetch(*args), missing))
+        fetched = {record["property_id"]: record for record in fetched}
+        save_property_cache(fetched)
+        cached.update(fetched)
+    return [cached[pid] for _, _, pid in summaries]
 
-    # 6. E-commerce data
-    print("Collecting e-commerce data...")
-    result["ecommerce"] = run_report(
-        data_client, property_id,
-        ["transactionId"],
-        ["ecommercePurchases", "purchaseRevenue", "totalUsers"],
-        date_range, limit=50, order_by_metric="purchaseRevenue"
-    )
 
-    # 7. Landing pages
-    print("Collecting landing pages...")
-    result["landing_pages"] = run_report(
-        data_client, property_id,
-        ["landingPage"],
-        ["sessions", "totalUsers", "engagementRate", "conversions"],
-        date_range, limit=30, order_by_metric="sessions"
-    )
+def primary_specs(date_range):
+    """Report specs of the primary dataset (steps 2-9)."""
+    return {
+        # Events inventory
+        "events": report_spec(
+            ["eventName"],
+            ["eventCount", "totalUsers"],
+            date_range, limit=50, order_by_metric="eventCount"),
+        # Conversions (key events)
+        "conversions": report_spec(
+            ["eventName", "isKeyEvent"],
+            ["eventCount", "totalUsers", "sessionsPerUser"],
+            date_range, limit=50),
+        # Traffic sources
+        "traffic": report_spec(
+            ["sessionSource", "sessionMedium"],
+            ["sessions", "totalUsers", "engagedSessions", "engagementRate", "conversions"],
+            date_range, limit=50, order_by_metric="sessions"),
+        # Campaign performance
+        "campaigns": report_spec(
+            ["sessionCampaignName", "sessionSource", "sessionMedium"],
+            ["sessions", "totalUsers", "conversions", "engagementRate"],
+            date_range, limit=50, order_by_metric="sessions"),
+        # E-commerce data
+        "ecommerce": report_spec(
+            ["transactionId"],
+            ["ecommercePurchases", "purchaseRevenue", "totalUsers"],
+            date_range, limit=50, order_by_metric="purchaseRevenue"),
+        # Landing pages
+        "landing_pages": report_spec(
+            ["landingPage"],
+            ["sessions", "totalUsers", "engagementRate", "conversions"],
+            date_range, limit=30, order_by_metric="sessions"),
+        # Device categories
+        "devices": report_spec(
+            ["deviceCategory"],
+            ["sessions", "totalUsers", "engagementRate", "conversions"],
+            date_range),
+        # Countries
+        "countries": report_spec(
+            ["country"],
+            ["sessions", "totalUsers", "engagementRate"],
+            date_range, limit=20, order_by_metric="sessions"),
+    }
 
-    # 8. Device categories
-    print("Collecting devices...")
-    result["devices"] = run_report(
-        data_client, property_id,
-        ["deviceCategory"],
-        ["sessions", "totalUsers", "engagementRate", "conversions"],
-        date_range
-    )
 
-    # 9. Countries
-    print("Collecting countries...")
-    result["countries"] = run_report(
-        data_client, property_id,
-        ["country"],
-        ["sessions", "totalUsers", "engagementRate"],
-        date_range, limit=20, order_by_metric="sessions"
-    )
+def collect_all(property_id, days=30, concurrency=GA4_CONCURRENCY,
+                property_only=False, refresh_properties=False, rows_dir=None, refresh_cache=False,
+                end_date=None):
+    """Collect all GA4 audit data."""
+    return collect_audit(property_id, days, concurrency=concurrency,
+                         property_only=property_only, refresh_properties=refresh_properties,
+                         rows_dir=rows_dir, refresh_cache=refresh_cache, end_date=end_date)[0]
+
+
+def collect_audit(property_id, days=30, extra_days=None, concurrency=GA4_CONCURRENCY,
+                  property_only=False, refresh_properties=False, rows_dir=None,
+                  refresh_cache=False, end_date=None):
+    """Collect the primary dataset, plus the extended one when extra_days is set.
+
+    The property crawl and every report batch of both datasets run at the
+    same time, so the audit takes about as long as its slowest call.
+    property_only limits the crawl to property_id itself. With rows_dir,
+    the FULL_EXPORTS reports are also paged through in full and streamed
+    to rows_dir/<report>.jsonl, listed under "exports" in each dataset.
+    Every date range ends on end_date (default: today).
+    Returns (primary, extra); extra is None without extra_days.
+    """
+    creds = get_credentials()
+    data_client = BetaAnalyticsDataClient(credentials=creds)
+    admin_client = AnalyticsAdminServiceClient(credentials=creds)
+
+    specs = primary_specs(date_range_for(days, end_date))
+    export_keys = list(FULL_EXPORTS)
+    if extra_days:
+        from ga4_collector_extra import FULL_EXPORTS as EXTRA_FULL_EXPORTS, assemble_extra, extra_specs
+        specs.update({f"extra:{key}": spec for key, spec in extra_specs(extra_days, end_date).items()})
+        export_keys += [f"extra:{key}" for key in EXTRA_FULL_EXPORTS]
+
+    # Report batches and full exports share one pool, so at most
+    # `concurrency` Data API requests are in flight between them
+    with ThreadPoolExecutor(max_workers=2) as pool, data_api_pool(concurrency) as api_pool:
+        # 1. Property metadata
+        print("Collecting property metadata...")
+        properties = pool.submit(fetch_properties, admin_client,
+                                 property_id if property_only else None, refresh_properties)
+        exports = {}
+        if rows_dir:
+            exports = pool.submit(export_reports, data_client, property_id,
+                                  {key.split(":")[-1]: specs[key] for key in export_keys},
+                                  rows_dir, pool=api_pool)
+        # 2-9. Reports
+        reports = run_reports(data_client, property_id, specs, refresh_cache=refresh_cache,
+                              pool=api_pool)
+        result = {"properties": properties.result()}
+        if rows_dir:
+            exports = exports.result()
 
-    return result
+    extra = None
+    if extra_days:
+        extra = assemble_extra({
+            key[len("extra:"):]: reports.pop(key) for key in list(reports) if key.startswith("extra:")
+        })
+        if exports:
+            extra["exports"] = {key: exports.pop(key) for key in EXTRA_FULL_EXPORTS}
+    result.update(reports)
+    if exports:
+        result["exports"] = exports
+    return result, extra
 
 
 def main():
@@ -203,14 +562,40 @@ def main():
     parser.add_argument("property_id", help="GA4 Property ID (numeric)")
     parser.add_argument("output_file", help="Output JSON file path")
     parser.add_argument("--days", type=int, default=30, help="Days of data to collect (default: 30)")
+    parser.add_argument("--end-date", type=parse_end_date, metavar="YYYY-MM-DD",
+                        help="Last day of the reported period (default: today); reports of "
+                             "periods that ended over three days ago are cached for good")
+    parser.add_argument("--concurrency", type=int, default=GA4_CONCURRENCY,
+                        help=f"GA4 batch requests in flight at once (default: {GA4_CONCURRENCY})")
+    parser.add_argument("--extra-output",
+                        help="Also collect the extended dataset (ga4_collector_extra.py) into this file")
+    parser.add_argument("--extra-days", type=int, default=90,
+                        help="Days for the extended dataset's trend data (default: 90)")
+    parser.add_argument("--property-only", action="store_true",
+                        help="Fetch metadata for the audited property only, not every visible property")
+    parser.add_argument("--refresh-properties", action="store_true",
+                        help="Ignore the cached property metadata (~/.config/ga4-audit/properties.json)")
+    parser.add_argument("--rows-dir",
+                        help="Also write every row of the campaign and landing-page reports "
+                             "(and event parameters with --extra-output) to <report>.jsonl here")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Re-query every report instead of reusing cached responses")
     args = parser.parse_args()
 
-    data = collect_all(args.property_id, args.days)
+    data, extra = collect_audit(args.property_id, args.days,
+                                args.extra_days if args.extra_output else None, args.concurrency,
+                                args.property_only, args.refresh_properties, args.rows_dir,
+                                args.refresh_cache, args.end_date)
 
     output_path = Path(args.output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_path.write_text(json.dumps(data, indent=2))
     print(f"Data saved to {output_path}")
+    if args.extra_output:
+        extra_path = Path(args.extra_output)
+        extra_path.parent.mkdir(parents=True, exist_ok=True)
+        extra_path.write_text(json.dumps(extra, indent=2))
+        print(f"Extended data saved to {extra_path}")
 
 
 if __name__ == "__main__":
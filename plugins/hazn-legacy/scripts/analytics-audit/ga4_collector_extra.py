@@ -5,7 +5,13 @@ Queries GA4 Data API for engagement metrics, weekly trends, referral sources,
 UTM mediums, browser distribution, event parameters, and Google Ads keyword data.
 
 Usage:
-    python ga4_collector_extra.py <property_id> <output_file> [--days 90]
+    python ga4_collector_extra.py <property_id> <output_file> [--days 90] [--end-date YYYY-MM-DD]
+                                  [--concurrency 4] [--rows-dir <dir>] [--refresh-cache]
+
+Report responses are cached like ga4_collector.py's.
+
+To collect it together with the primary dataset in one concurrent run, use
+ga4_collector.py --extra-output instead.
 
 Prerequisites: Same as ga4_collector.py
 """
@@ -13,171 +19,121 @@ Prerequisites: Same as ga4_collector.py
 import argparse
 import json
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 
 from google.analytics.data_v1beta import BetaAnalyticsDataClient
-from google.analytics.data_v1beta.types import (
-    DateRange, Dimension, Metric, OrderBy, RunReportRequest
-)
 
 # Import shared credentials from primary collector
 sys.path.insert(0, str(Path(__file__).parent))
-from ga4_collector import get_credentials, run_report
+from ga4_collector import (
+    GA4_CONCURRENCY, date_range_for, export_reports, get_credentials, parse_end_date, report_spec,
+    run_reports
+)
 
+# Reports that are truncated in the JSON output; --rows-dir exports them in full
+FULL_EXPORTS = ("event_params",)
 
-def collect_extra(property_id, days=90):
-    """Collect extended GA4 audit data."""
-    creds = get_credentials()
-    client = BetaAnalyticsDataClient(credentials=creds)
-
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
 
-    date_range_90d = DateRange(
-        start_date=start_date.strftime("%Y-%m-%d"),
-        end_date=end_date.strftime("%Y-%m-%d"),
-    )
-    date_range_30d = DateRange(
-        start_date=(end_date - timedelta(days=30)).strftime("%Y-%m-%d"),
-        end_date=end_date.strftime("%Y-%m-%d"),
-    )
+def extra_specs(days=90, end_date=None):
+    """Report specs of the extended dataset; `days` sets the trend window.
 
-    result = {}
+    Every date range ends on end_date (default: today).
+    """
+    end_date = end_date or datetime.now()
+    date_range_90d = date_range_for(days, end_date)
+    date_range_30d = date_range_for(30, end_date)
 
-    # 1. Overall engagement (30d) — split into two requests (GA4 limit: 10 metrics)
-    print("Collecting engagement metrics (batch 1)...")
+    # 1. Overall engagement (30d) — split into two reports (GA4 limit: 10 metrics)
     batch1_metrics = [
         "sessions", "totalUsers", "newUsers", "activeUsers",
         "engagedSessions", "engagementRate", "bounceRate",
         "averageSessionDuration", "screenPageViewsPerSession", "conversions",
     ]
-    request = RunReportRequest(
-        property=f"properties/{property_id}",
-        metrics=[Metric(name=m) for m in batch1_metrics],
-        date_ranges=[date_range_30d],
-    )
-    response = client.run_report(request)
-    engagement = {}
-    if response.rows:
-        row = response.rows[0]
-        engagement.update({
-            name: row.metric_values[i].value
-            for i, name in enumerate(batch1_metrics)
-        })
-
-    print("Collecting engagement metrics (batch 2)...")
     batch2_metrics = ["eventCount", "sessionsPerUser", "userEngagementDuration"]
-    request = RunReportRequest(
-        property=f"properties/{property_id}",
-        metrics=[Metric(name=m) for m in batch2_metrics],
-        date_ranges=[date_range_30d],
-    )
-    response = client.run_report(request)
-    if response.rows:
-        row = response.rows[0]
-        engagement.update({
-            name: row.metric_values[i].value
-            for i, name in enumerate(batch2_metrics)
-        })
+
+    return {
+        "engagement_batch1": report_spec([], batch1_metrics, date_range_30d, limit=None),
+        "engagement_batch2": report_spec([], batch2_metrics, date_range_30d, limit=None),
+        # 2. Weekly trends (90d)
+        "weekly_trends": report_spec(
+            ["week"],
+            ["sessions", "totalUsers", "conversions", "engagementRate"],
+            date_range_90d, limit=52, order_by_metric="sessions"),
+        # 3. Referral sources (30d)
+        "referrals": report_spec(
+            ["sessionSource"],
+            ["sessions", "totalUsers", "engagementRate"],
+            date_range_30d, limit=30, order_by_metric="sessions"),
+        # 4. UTM mediums (30d)
+        "utm_mediums": report_spec(
+            ["sessionMedium"],
+            ["sessions"],
+            date_range_30d, limit=30, order_by_metric="sessions"),
+        # 5. New vs returning (30d)
+        "new_vs_returning": report_spec(
+            ["newVsReturning"],
+            ["sessions", "totalUsers", "engagementRate", "conversions"],
+            date_range_30d),
+        # 6. Browser distribution (30d)
+        "browsers": report_spec(
+            ["browser"],
+            ["sessions", "totalUsers"],
+            date_range_30d, limit=10, order_by_metric="sessions"),
+        # 7. Event parameters — contentType by event (30d)
+        "event_params": report_spec(
+            ["eventName", "contentType"],
+            ["eventCount"],
+            date_range_30d, limit=50, order_by_metric="eventCount"),
+        # 8. Google Ads keywords (30d)
+        "ads_keywords": report_spec(
+            ["sessionGoogleAdsKeyword"],
+            ["sessions", "conversions"],
+            date_range_30d, limit=20, order_by_metric="sessions"),
+        # 9. Google Ads search queries (30d)
+        "ads_queries": report_spec(
+            ["sessionGoogleAdsQuery"],
+            ["sessions", "conversions"],
+            date_range_30d, limit=20, order_by_metric="sessions"),
+        # 10. Engagement summary (90d)
+        "engagement_90d": report_spec(
+            [],
+            ["sessions", "totalUsers", "conversions", "engagementRate", "bounceRate"],
+            date_range_90d, limit=None),
+    }
+
+
+def assemble_extra(reports):
+    """Shape the rows of extra_specs() reports into the extended dataset."""
+    result = {}
+    engagement = {}
+    for key in ("engagement_batch1", "engagement_batch2"):
+        rows = reports.pop(key)
+        if rows:
+            engagement.update(rows[0])
     result["engagement"] = engagement
+    engagement_90d = reports.pop("engagement_90d")
+    result.update(reports)
+    if engagement_90d:
+        result["engagement_90d"] = engagement_90d[0]
+
+    return result
+
 
-    # 2. Weekly trends (90d)
-    print("Collecting weekly trends...")
-    result["weekly_trends"] = run_report(
-        client, property_id,
-        ["week"],
-        ["sessions", "totalUsers", "conversions", "engagementRate"],
-        date_range_90d, limit=52, order_by_metric="sessions"
-    )
-
-    # 3. Referral sources (30d)
-    print("Collecting referrals...")
-    result["referrals"] = run_report(
-        client, property_id,
-        ["sessionSource"],
-        ["sessions", "totalUsers", "engagementRate"],
-        date_range_30d, limit=30, order_by_metric="sessions"
-    )
-
-    # 4. UTM mediums (30d)
-    print("Collecting UTM mediums...")
-    result["utm_mediums"] = run_report(
-        client, property_id,
-        ["sessionMedium"],
-        ["sessions"],
-        date_range_30d, limit=30, order_by_metric="sessions"
-    )
-
-    # 5. New vs returning (30d)
-    print("Collecting new vs returning...")
-    result["new_vs_returning"] = run_report(
-        client, property_id,
-        ["newVsReturning"],
-        ["sessions", "totalUsers", "engagementRate", "conversions"],
-        date_range_30d
-    )
-
-    # 6. Browser distribution (30d)
-    print("Collecting browsers...")
-    result["browsers"] = run_report(
-        client, property_id,
-        ["browser"],
-        ["sessions", "totalUsers"],
-        date_range_30d, limit=10, order_by_metric="sessions"
-    )
-
-    # 7. Event parameters — contentType by event (30d)
-    print("Collecting event parameters...")
-    result["event_params"] = run_report(
-        client, property_id,
-        ["eventName", "contentType"],
-        ["eventCount"],
-        date_range_30d, limit=50, order_by_metric="eventCount"
-    )
-
-    # 8. Google Ads keywords (30d)
-    print("Collecting Ads keywords...")
-    result["ads_keywords"] = run_report(
-        client, property_id,
-        ["sessionGoogleAdsKeyword"],
-        ["sessions", "conversions"],
-        date_range_30d, limit=20, order_by_metric="sessions"
-    )
-
-    # 9. Google Ads search queries (30d)
-    print("Collecting Ads queries...")
-    result["ads_queries"] = run_report(
-        client, property_id,
-        ["sessionGoogleAdsQuery"],
-        ["sessions", "conversions"],
-        date_range_30d, limit=20, order_by_metric="sessions"
-    )
-
-    # 10. Engagement summary (90d)
-    print("Collecting 90d engagement...")
-    request = RunReportRequest(
-        property=f"properties/{property_id}",
-        metrics=[
-            Metric(name="sessions"),
-            Metric(name="totalUsers"),
-            Metric(name="conversions"),
-            Metric(name="engagementRate"),
-            Metric(name="bounceRate"),
-        ],
-        date_ranges=[date_range_90d],
-    )
-    response = client.run_report(request)
-    if response.rows:
-        row = response.rows[0]
-        result["engagement_90d"] = {
-            "sessions": row.metric_values[0].value,
-            "totalUsers": row.metric_values[1].value,
-            "conversions": row.metric_values[2].value,
-            "engagementRate": row.metric_values[3].value,
-            "bounceRate": row.metric_values[4].value,
-        }
+def collect_extra(property_id, days=90, concurrency=GA4_CONCURRENCY, rows_dir=None,
+                  refresh_cache=False, end_date=None):
+    """Collect extended GA4 audit data.
 
+    With rows_dir, the FULL_EXPORTS reports are also streamed in full to
+    rows_dir/<report>.jsonl and listed under "exports".
+    """
+    creds = get_credentials()
+    client = BetaAnalyticsDataClient(credentials=creds)
+    specs = extra_specs(days, end_date)
+    result = assemble_extra(run_reports(client, property_id, specs, concurrency, refresh_cache))
+    if rows_dir:
+        result["exports"] = export_reports(
+            client, property_id, {key: specs[key] for key in FULL_EXPORTS}, rows_dir, concurrency)
     return result
 
 
@@ -186,9 +142,18 @@ def main():
     parser.add_argument("property_id", help="GA4 Property ID (numeric)")
     parser.add_argument("output_file", help="Output JSON file path")
     parser.add_argument("--days", type=int, default=90, help="Days for trend data (default: 90)")
+    parser.add_argument("--end-date", type=parse_end_date, metavar="YYYY-MM-DD",
+                        help="Last day of the reported period (default: today)")
+    parser.add_argument("--concurrency", type=int, default=GA4_CONCURRENCY,
+                        help=f"GA4 batch requests in flight at once (default: {GA4_CONCURRENCY})")
+    parser.add_argument("--rows-dir",
+                        help="Also write every event parameter row to <dir>/event_params.jsonl")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Re-query every report instead of reusing cached responses")
     args = parser.parse_args()
 
-    data = collect_extra(args.property_id, args.days)
+    data = collect_extra(args.property_id, args.days, args.concurrency, args.rows_dir,
+                         args.refresh_cache, args.end_date)
 
     output_path = Path(args.output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Teaser Collector Benchmark — Offline Performance Harness
+Runs teaser_collector against synthetic sites served from a local HTTP(S)
+server, so performance changes can be measured without touching real
+websites:
+  - baseline     small site (home page, robots.txt, 1,000-URL sitemap)
+  - index-10m    sitemap index of gzip children, 10M URLs by default
+  - redirects    long redirect chain in front of the home page
+  - slow-ttfb    every response delayed before the first byte
+  - huge-html    64 MB home page
+  - bad-robots   pathological robots.txt (thousands of groups, wildcard
+                 rules, very long lines) checked against a 100k-URL sitemap
+  - bulk         many small sites through collect_bulk()
+  - disk-cache   repeated runs on one DiskCache; robots.txt and the sitemap
+                 carry ETags and must be revalidated with a 304 after the
+                 first run (the worker fails otherwise)
+  - keep-alive   Content-Length bodies, a redirect chain and a liveness
+                 sample of HEADs; every request must reuse a pooled
+                 connection (the worker fails when a run opens more than
+                 one per host slot)
+
+Usage:
+    python teaser_benchmark.py [--scenarios NAME,...] [--sitemap-urls N] [--repeat N]
+                               [--bulk-sites N] [--slow-ttfb SECONDS] [--https]
+                               [--output FILE]
+
+Every scenario runs in a fresh worker process, so "peak RSS" is the
+collector's own high-water mark (the server lives in another process).
+Reported per scenario: wall time p50/p95 over the repeats (per domain for
+bulk), throughput (sitemap URLs/s, or sites/s for bulk), peak RSS,
+requests and bytes.
+"""
+
+import argparse
+import contextlib
+import http.server
+import io
+import json
+import math
+import os
+import resource
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SITEMAP_CHILD_URLS = 50_000  # sitemaps.org limit per file
+ENTRY_BATCH = 1000
+SCENARIO_ORDER = ["baseline", "index-10m", "redirects", "slow-ttfb", "huge-html",
+                  "bad-robots", "bulk", "disk-cache", "keep-alive"]
+# Validator of the revalidated resources in the disk-cache scenario
+SITE_ETAG = '"bench-v1"'
+REVALIDATED_PATHS = ("/robots.txt", "/sitemap.xml")
+# Sitemap URLs HEAD-checked per run in the keep-alive scenario
+KEEPALIVE_LIVENESS = 50
+# Connections a keep-alive run may open beyond one per host slot: the
+# scheme variant probe dials the other scheme on the same port
+KEEPALIVE_SPARE_CONNECTIONS = 2
+
+
+# --- Synthetic sites ---
+
+class SyntheticSite:
+    """Content of one synthetic site, generated on the fly.
+
+    Nothing is held in memory: sitemaps and HTML are produced in batches
+    while they are written, so the server can stand in for sites far
+    larger than the machine running it.
+    """
+
+    def __init__(self, urls=1000, gzip_children=False, redirect_hops=0, ttfb=0.0,
+                 html_bytes=32 * 1024, robots="plain", etags=False, content_length=False):
+        self.urls = urls
+        self.gzip_children = gzip_children
+        self.redirect_hops = redirect_hops
+        self.ttfb = ttfb
+        self.html_bytes = html_bytes
+        self.robots = robots
+        self.etags = etags
+        self.content_length = content_length
+
+    def route(self, path, origin):
+        """(status, headers, chunks) for a request path; chunks is an iterable of bytes."""
+        path = path.split("?", 1)[0]
+        if path == "/" and self.redirect_hops:
+            return 301, {"Location": "/hop/1"}, []
+        if path.startswith("/hop/"):
+            hop = int(path[5:])
+            target = f"/hop/{hop + 1}" if hop < self.redirect_hops else "/home"
+            return 301, {"Location": target}, []
+        if path in ("/", "/home"):
+            return 200, {"Content-Type": "text/html; charset=utf-8"}, self.html()
+        if path == "/robots.txt":
+            return 200, {"Content-Type": "text/plain"}, self.robots_txt(origin)
+        if path == "/sitemap.xml":
+            if self.urls > SITEMAP_CHILD_URLS:
+                return 200, {"Content-Type": "application/xml"}, self.sitemap_index(origin)
+            return 200, {"Content-Type": "application/xml"}, self.urlset(origin, 0, self.urls)
+        if path.startswith("/sitemaps/"):
+            name = path[len("/sitemaps/"):]
+            child = int(name.split(".", 1)[0])
+            start = child * SITEMAP_CHILD_URLS
+            if start >= self.urls:
+                return 404, {}, [b"not found"]
+            chunks = self.urlset(origin, start, min(start + SITEMAP_CHILD_URLS, self.urls))
+            if name.endswith(".gz"):
+                return 200, {"Content-Type": "application/x-gzip"}, gzip_chunks(chunks)
+            return 200, {"Content-Type": "application/xml"}, chunks
+        if path.startswith("/p/"):
+            return 200, {"Content-Type": "text/html"}, [b"<html><body>page</body></html>"]
+        return 404, {"Content-Type": "text/plain"}, [b"not found"]
+
+    def html(self):
+        head = (b'<!DOCTYPE html><html><head><meta name="generator" content="WordPress 6.4">'
+                b'<script src="/wp-content/themes/x/app.js"></script>'
+                b'<script src="https://www.googletagmanager.com/gtag/js?id=G-BENCH"></script>'
+                b"</head><body>")
+        filler = b"<div class=\"post\"><p>" + b"lorem ipsum dolor sit amet " * 36 + b"</p></div>\n"
+        yield head
+        written = len(head)
+        while written < self.html_bytes:
+            batch = filler * 64
+            yield batch
+            written += len(batch)
+        yield b"</body></html>"
+
+    def robots_txt(self, origin):
+        if self.robots == "pathological":
+            yield from pathological_robots(origin)
+            return
+        yield (f"User-agent: *\nDisallow: /admin/\nAllow: /admin/public\n"
+               f"User-agent: GPTBot\nDisallow: /\n"
+               f"Sitemap: {origin}/sitemap.xml\n").encode()
+
+    def sitemap_index(self, origin):
+        suffix = ".xml.gz" if self.gzip_children else ".xml"
+        children = math.ceil(self.urls / SITEMAP_CHILD_URLS)
+        yield b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for child in range(children):
+            yield (f"<sitemap><loc>{origin}/sitemaps/{child}{suffix}</loc>"
+                   f"<lastmod>2024-06-01</lastmod></sitemap>\n").encode()
+        yield b"</sitemapindex>\n"
+
+    def urlset(self, origin, start, stop):
+        yield b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        sections = ("blog", "products", "docs", "news")
+        for batch_start in range(start, stop, ENTRY_BATCH):
+            yield "".join(
+                f"<url><loc>{origin}/p/{sections[i % 4]}/{i}</loc>"
+                f"<lastmod>20{20 + i % 5}-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00+00:00"
+                f"</lastmod></url>\n"
+                for i in range(batch_start, min(batch_start + ENTRY_BATCH, stop))
+            ).encode()
+        yield b"</urlset>\n"
+
+
+def pathological_robots(origin):
+    """robots.txt built to hurt: many agents, wildcard-heavy rules, huge lines."""
+    yield f"Sitemap: {origin}/sitemap.xml\n".encode()
+    for group in range(2000):
+        yield f"User-agent: bot{group}\nUser-agent: GPTBot\n".encode()
+        yield f"Disallow: /p/blog/{group}\nAllow: /p/blog/{group}*/ok$\n".encode()
+        yield f"Disallow: /*{group % 10}*{group % 7}*{group % 3}*.pdf$\n".encode()
+    yield b"User-agent: *\n"
+    for rule in range(5000):
+        yield f"Disallow: /p/docs/{rule}/\n".encode()
+    yield b"Disallow: /" + b"a*" * 5000 + b"$\n"
+    yield b"# " + b"x" * 100_000 + b"\n"
+
+
+def gzip_chunks(chunks):
+    """Gzip-compress an iterable of chunks as it is consumed."""
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class SyntheticHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def respond(self, head):
+        site = self.server.site
+        if site.ttfb:
+            time.sleep(site.ttfb)
+        origin = f"{self.server.scheme}://{self.headers.get('Host')}"
+        if site.etags and self.path in REVALIDATED_PATHS:
+            if self.headers.get("If-None-Match") == SITE_ETAG:
+                self.send_response(304)
+                self.send_header("ETag", SITE_ETAG)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        status, headers, chunks = site.route(self.path, origin)
+        if site.etags and self.path in REVALIDATED_PATHS and status == 200:
+            headers = {**headers, "ETag": SITE_ETAG}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if not chunks:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if site.content_length:
+            body = b"".join(chunks)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+            return
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if head:
+            return
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The collector stops reading at its byte budget or deadline
+            self.close_connection = True
+
+
+class SiteServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, site, ssl_context=None):
+        super().__init__(address, SyntheticHandler)
+        self.site = site
+        self.scheme = "https" if ssl_context else "http"
+        if ssl_context:
+            self.socket = ssl_context.wrap_socket(self.socket, server_side=True)
+
+
+def scenario_sites(args):
+    """{scenario: [SyntheticSite, ...]} for the selected scenarios."""
+    sites = {
+        "baseline": [SyntheticSite()],
+        "index-10m": [SyntheticSite(urls=args.sitemap_urls, gzip_children=True)],
+        "redirects": [SyntheticSite(redirect_hops=8)],
+        "slow-ttfb": [SyntheticSite(ttfb=args.slow_ttfb)],
+        "huge-html": [SyntheticSite(html_bytes=64 * 1024 * 1024)],
+        "bad-robots": [SyntheticSite(urls=100_000, robots="pathological")],
+        "bulk": [SyntheticSite(urls=2000) for _ in range(args.bulk_sites)],
+        "disk-cache": [SyntheticSite(etags=True)],
+        "keep-alive": [SyntheticSite(redirect_hops=3, content_length=True)],
+    }
+    return {name: sites[name] for name in args.scenarios}
+
+
+def loopback_address(index):
+    """Distinct 127.0.0.x per site, so per-host connection caps do not overlap."""
+    return f"127.0.0.{2 + index % 250}"
+
+
+def make_certificate(directory, addresses):
+    """Self-signed certificate for localhost and the given IPs; returns (cert, key)."""
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    san = ",".join(["DNS:localhost"] + [f"IP:{ip}" for ip in sorted(set(addresses))])
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", f"subjectAltName={san}",
+         "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def serve(config):
+    """Start a server per synthetic site and print {scenario: [base URLs]} as JSON."""
+    ssl_context = None
+    if config.get("cert"):
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(config["cert"], config["key"])
+    args = argparse.Namespace(**config["args"])
+    urls = {}
+    index = 0
+    for scenario, sites in scenario_sites(args).items():
+        urls[scenario] = []
+        for site in sites:
+            address = loopback_address(index)
+            index += 1
+            try:
+                server = SiteServer((address, 0), site, ssl_context)
+            except OSError:  # only 127.0.0.1 is configured (e.g. macOS)
+                address = "127.0.0.1"
+                server = SiteServer((address, 0), site, ssl_context)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            scheme = "https" if ssl_context else "http"
+            urls[scenario].append(f"{scheme}://{address}:{server.server_address[1]}")
+    print(json.dumps(urls), flush=True)
+    sys.stdin.read()  # serve until the harness closes our stdin
+
+
+# --- Worker ---
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def run_scenario(scenario, urls, repeat, workers):
+    """Run one scenario in this process and return its metrics."""
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import teaser_collector
+
+    walls, records = [], []
+    started = time.perf_counter()
+    if scenario == "bulk":
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "bulk.jsonl"
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = teaser_collector.collect_bulk(urls, output, workers=workers)
+            for line in output.read_text().splitlines():
+                records.append(json.loads(line))
+        elapsed = time.perf_counter() - started
+        walls = [record["timing"]["wall_s"] for record in records if "timing" in record]
+        throughput = {"sites_per_s": round(len(records) / elapsed, 2), "failed": stats["failed"]}
+    elif scenario == "disk-cache":
+        with tempfile.TemporaryDirectory() as tmp:
+            disk_cache = teaser_collector.DiskCache(tmp)
+            for run in range(max(2, repeat)):
+                run_started = time.perf_counter()
+                records.append(teaser_collector.collect(urls[0], verbose=False,
+                                                        disk_cache=disk_cache))
+                walls.append(time.perf_counter() - run_started)
+                if run == 0:
+                    missing = [path for path in REVALIDATED_PATHS
+                               if disk_cache.lookup(urls[0] + path) is None]
+                    if missing:
+                        raise SystemExit(f"Not stored in the disk cache: {', '.join(missing)}")
+            stats = disk_cache.stats()
+        elapsed = time.perf_counter() - started
+        expected = len(REVALIDATED_PATHS) * (len(records) - 1)
+        if stats["hits"] < expected:
+            raise SystemExit(f"Only {stats['hits']} of {expected} revalidations hit the disk cache")
+        sitemap_urls = sum(record["sitemap"].get("total_urls", 0) for record in records)
+        throughput = {"sitemap_urls": sitemap_urls // len(records),
+                      "sitemap_urls_per_s": round(sitemap_urls / elapsed),
+                      "disk_cache_hits": stats["hits"]}
+    elif scenario == "keep-alive":
+        allowed = teaser_collector.MAX_PER_HOST + KEEPALIVE_SPARE_CONNECTIONS
+        for _ in range(repeat):
+            run_started = time.perf_counter()
+            record = teaser_collector.collect(urls[0], verbose=False,
+                                              liveness_sample=KEEPALIVE_LIVENESS)
+            walls.append(time.perf_counter() - run_started)
+            records.append(record)
+            connects = record["connections"]["tcp_connects"]
+            if connects > allowed:
+                raise SystemExit(f"{record['timing']['requests']} requests opened {connects} "
+                                 f"connections (at most {allowed} expected)")
+        elapsed = time.perf_counter() - started
+        sitemap_urls = sum(record["sitemap"].get("total_urls", 0) for record in records)
+        throughput = {"sitemap_urls": sitemap_urls // len(records),
+                      "sitemap_urls_per_s": round(sitemap_urls / elapsed),
+                      "tcp_connects": max(record["connections"]["tcp_connects"]
+                                          for record in records)}
+    else:
+        for _ in range(repeat):
+            run_started = time.perf_counter()
+            records.append(teaser_collector.collect(urls[0], verbose=False))
+            walls.append(time.perf_counter() - run_started)
+        elapsed = time.perf_counter() - started
+        sitemap_urls = sum(record["sitemap"].get("total_urls", 0) for record in records)
+        throughput = {"sitemap_urls": sitemap_urls // len(records),
+                      "sitemap_urls_per_s": round(sitemap_urls / elapsed)}
+
+    return {
+        "scenario": scenario,
+        "runs": len(walls),
+        "wall_p50_s": round(percentile(walls, 50), 3) if walls else None,
+        "wall_p95_s": round(percentile(walls, 95), 3) if walls else None,
+        **throughput,
+        "peak_rss_mb": peak_rss_mb(),
+        "requests": sum(record.get("timing", {}).get("requests", 0) for record in records),
+        "bytes": sum(record.get("timing", {}).get("bytes", 0) for record in records),
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+# --- Harness ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Teaser Collector Benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIO_ORDER),
+                        help=f"Comma-separated scenarios (default: all of {', '.join(SCENARIO_ORDER)})")
+    parser.add_argument("--sitemap-urls", type=int, default=10_000_000,
+                        help="URLs in the index-10m sitemap tree (default: 10,000,000)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="collect() runs per single-site scenario (default: 5; index-10m runs once)")
+    parser.add_argument("--bulk-sites", type=int, default=50,
+                        help="Synthetic sites in the bulk scenario (default: 50)")
+    parser.add_argument("--workers", type=int, default=32,
+                        help="collect_bulk() workers (default: 32)")
+    parser.add_argument("--slow-ttfb", type=float, default=1.0,
+                        help="Delay before every response in slow-ttfb, in seconds (default: 1.0)")
+    parser.add_argument("--https", action="store_true",
+                        help="Serve over TLS with a throwaway self-signed certificate (needs openssl)")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(json.loads(args.serve))
+        return
+    if args.worker:
+        job = json.loads(args.worker)
+        print(json.dumps(run_scenario(**job)))
+        return
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIO_ORDER)
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    tmp = Path(tempfile.mkdtemp(prefix="teaser-bench-"))
+    env = dict(os.environ)
+    config = {"args": {key: getattr(args, key) for key in
+                       ("scenarios", "sitemap_urls", "bulk_sites", "slow_ttfb")}}
+    if args.https:
+        addresses = ["127.0.0.1"] + [loopback_address(i) for i in range(250)]
+        cert, key = make_certificate(tmp, addresses)
+        config.update(cert=str(cert), key=str(key))
+        env["SSL_CERT_FILE"] = str(cert)
+
+    server = subprocess.Popen([sys.executable, __file__, "--serve", json.dumps(config)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    results = []
+    try:
+        site_urls = json.loads(server.stdout.readline())
+        print(f"Teaser Collector Benchmark ({'https' if args.https else 'http'})")
+        print(f"  {'scenario':<12} {'p50 s':>8} {'p95 s':>8} {'throughput':>22} {'RSS MB':>8}")
+        for scenario in args.scenarios:
+            job = {
+                "scenario": scenario,
+                "urls": site_urls[scenario],
+                "repeat": 1 if scenario == "index-10m" else args.repeat,
+                "workers": args.workers,
+            }
+            worker = subprocess.run([sys.executable, __file__, "--worker", json.dumps(job)],
+                                    capture_output=True, text=True, env=env)
+            if worker.returncode != 0:
+                print(f"  {scenario:<12} failed:\n{worker.stderr}")
+                continue
+            result = json.loads(worker.stdout.strip().splitlines()[-1])
+            results.append(result)
+            if "sites_per_s" in result:
+                throughput = f"{result['sites_per_s']} sites/s"
+            else:
+                throughput = f"{result['sitemap_urls_per_s']:,} URLs/s"
+            print(f"  {scenario:<12} {result['wall_p50_s']:>8} {result['wall_p95_s']:>8}"
+                  f" {throughput:>22} {result['peak_rss_mb']:>8}")
+    finally:
+        server.stdin.close()
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,25 +8,59 @@ any API keys or authentication:
   - Security headers (HSTS, CSP, X-Frame-Options, etc.)
   - SSL certificate info (issuer, expiry, grade)
   - Technology stack detection (CMS, framework, hosting/CDN)
-  - Redirect chain recording
+  - Redirect chain recording (incl. http/https and www/non-www variants)
   - DNS info
 
 Usage:
-    python teaser_collector.py <URL> <output_file>
+    python teaser_collector.py <URL> <output_file> [--sequential] [--sitemap-url-budget N]
+                               [--sitemap-workers N] [--sitemap-sample N] [--max-per-host N]
+                               [--liveness N|all] [--deadline SECONDS] [--trace FILE]
+                               [--fingerprints FILE]
+                               [--body-budget TYPE=BYTES ...] [--no-http-cache]
+    python teaser_collector.py --bulk <domains_file> <output.jsonl> [--workers 32]
+
+Probes run concurrently by default; only the sitemap analysis waits for
+robots.txt (it needs the Sitemap: lines). Pass --sequential to run them
+one after another. All requests of a run share one Session (see
+teaser_transport.py), which keeps a pool of keep-alive connections per
+host and asks for compressed bodies (brotli only when the optional
+`brotli` package is installed). Buffered
+responses are cached per run, so each URL is fetched at most once; the
+hit/miss counts are recorded under "http_cache".
 """
 
 import argparse
+import bisect
+import contextlib
+import functools
+import hashlib
+import ipaddress
 import json
+import math
+import random
 import re
 import socket
 import ssl
 import sys
-import urllib.request
+import threading
+import time
 import urllib.parse
-import urllib.error
-from datetime import datetime, timezone
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from xml.etree import ElementTree
+from xml.sax.saxutils import unescape as xml_unescape
+
+# HTTP transport and caches shared by all probes
+sys.path.insert(0, str(Path(__file__).parent))
+from teaser_transport import (
+    BODY_BUDGETS, CURRENT_PROBE, DNS_TIMEOUT, GZIP_CONTENT_TYPES, GZIP_MAGIC, HTTP_CACHE_DIR,
+    HTTP_CACHE_MAX_BYTES, MAX_PER_HOST, MAX_REDIRECTS, READ_CHUNK, REDIRECT_CODES,
+    DeadlineExceeded, DecodedBody, DiskCache, HostContext, HostLimiter, PrefixedStream,
+    RunMetrics, Session, get_header, submit_in_context,
+)
 
 
 def normalize_url(url):
@@ -36,45 +70,43 @@ def normalize_url(url):
     return url.rstrip("/")
 
 
-def fetch_url(url, timeout=15, follow_redirects=True):
-    """Fetch a URL and return (response_body, headers, status_code, redirect_chain)."""
+def fetch_url(url, timeout=15, follow_redirects=True, session=None, resource="html"):
+    """Fetch a URL and return (response_body, headers, status_code, redirect_chain).
+
+    The body is capped at the session's byte budget for `resource`.
+    """
+    if session is None:
+        with Session() as session:
+            return fetch_url(url, timeout, follow_redirects, session, resource)
+
     redirect_chain = []
     current_url = url
-    max_redirects = 10
-
-    for _ in range(max_redirects):
-        req = urllib.request.Request(current_url)
-        req.add_header("User-Agent", "Mozilla/5.0 (compatible; AnalyticsAuditBot/1.0)")
 
+    for _ in range(MAX_REDIRECTS):
         try:
-            opener = urllib.request.build_opener(urllib.request.HTTPRedirectHandler)
-            resp = opener.open(req, timeout=timeout)
-            body = resp.read().decode("utf-8", errors="replace")
-            return body, dict(resp.headers), resp.status, redirect_chain
-        except urllib.error.HTTPError as e:
-            if e.code in (301, 302, 307, 308) and follow_redirects:
-                location = e.headers.get("Location", "")
-                if location:
-                    redirect_chain.append({
-                        "from": current_url,
-                        "to": location,
-                        "status": e.code,
-                    })
-                    current_url = urllib.parse.urljoin(current_url, location)
-                    continue
-            body = e.read().decode("utf-8", errors="replace") if e.fp else ""
-            return body, dict(e.headers) if e.headers else {}, e.code, redirect_chain
-        except urllib.error.URLError as e:
-            return None, {}, 0, redirect_chain
-        except Exception as e:
+            status, headers, body = session.fetch("GET", current_url, timeout=timeout,
+                                                  resource=resource)
+        except Exception:
             return None, {}, 0, redirect_chain
 
+        if status in REDIRECT_CODES and follow_redirects:
+            location = get_header(headers, "Location")
+            if location:
+                redirect_chain.append({
+                    "from": current_url,
+                    "to": location,
+                    "status": status,
+                })
+                current_url = urllib.parse.urljoin(current_url, location)
+                continue
+        return body, headers, status, redirect_chain
+
     return None, {}, 0, redirect_chain
 
 
-def fetch_simple(url, timeout=15):
+def fetch_simple(url, timeout=15, session=None, resource="html"):
     """Simple fetch returning just the body text, or None on failure."""
-    body, _, status, _ = fetch_url(url, timeout)
+    body, _, status, _ = fetch_url(url, timeout, session=session, resource=resource)
     if status == 200 and body:
         return body
     return None
@@ -82,10 +114,21 @@ def fetch_simple(url, timeout=15):
 
 # --- Robots.txt ---
 
-def analyze_robots(base_url):
+AI_CRAWLERS = [
+    "GPTBot", "ChatGPT-User", "Google-Extended", "CCBot",
+    "anthropic-ai", "ClaudeBot", "Claude-Web", "Bytespider",
+    "Amazonbot", "PerplexityBot", "YouBot", "Applebot-Extended",
+    "cohere-ai", "FacebookBot", "Meta-ExternalAgent",
+]
+
+# Crawlers whose access to sitemap URLs is reported
+ROBOTS_REPORT_AGENTS = ["Googlebot"] + AI_CRAWLERS
+
+
+def analyze_robots(base_url, session=None):
     """Fetch and analyze robots.txt."""
     robots_url = f"{base_url}/robots.txt"
-    body = fetch_simple(robots_url)
+    body = fetch_simple(robots_url, session=session, resource="robots")
     if not body:
         return {"found": False, "url": robots_url}
 
@@ -101,13 +144,7 @@ def analyze_robots(base_url):
         "line_count": len(lines),
     }
 
-    ai_crawlers = [
-        "GPTBot", "ChatGPT-User", "Google-Extended", "CCBot",
-        "anthropic-ai", "ClaudeBot", "Claude-Web", "Bytespider",
-        "Amazonbot", "PerplexityBot", "YouBot", "Applebot-Extended",
-        "cohere-ai", "FacebookBot", "Meta-ExternalAgent",
-    ]
-    ai_crawler_lower = {c.lower(): c for c in ai_crawlers}
+    ai_crawler_lower = {c.lower(): c for c in AI_CRAWLERS}
 
     current_agent = None
     for line in lines:
@@ -160,10 +197,633 @@ def analyze_robots(base_url):
     return result
 
 
+def url_path(url):
+    """Path and query of an absolute URL, without splitting the whole URL."""
+    start = url.find("/", url.find("//") + 2) if "//" in url else url.find("/")
+    path = url[start:] if start >= 0 else "/"
+    return path.split("#", 1)[0]
+
+
+def parse_robots_groups(body):
+    """Split robots.txt into groups of ([user agents], [(allow, path)]).
+
+    Consecutive User-agent lines share the rules that follow them, per
+    RFC 9309. Agent tokens are lowercased; rules before the first
+    User-agent line are ignored.
+    """
+    groups = []
+    current = None
+    in_agent_lines = False
+    for line in body.splitlines():
+        line = line.split("#", 1)[0].strip()
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        key = key.strip().lower()
+        value = value.strip()
+        if key == "user-agent":
+            if current is None or not in_agent_lines:
+                current = ([], [])
+                groups.append(current)
+            current[0].append(value.lower())
+            in_agent_lines = True
+            continue
+        in_agent_lines = False
+        if key in ("allow", "disallow") and current is not None and value:
+            current[1].append((key == "allow", value))
+    return groups
+
+
+def _glob_match(parts, anchored, path):
+    """Whether path matches a robots pattern split on "*", without backtracking.
+
+    Taking the leftmost occurrence of each part is always safe for "*"
+    globs; a $-anchored pattern also needs its last part at the very end.
+    """
+    first = parts[0]
+    if not path.startswith(first):
+        return False
+    pos = len(first)
+    if len(parts) == 1:
+        return not anchored or pos == len(path)
+    end = len(path)
+    middle = parts[1:]
+    if anchored:
+        last = parts[-1]
+        if not path.endswith(last) or end - len(last) < pos:
+            return False
+        end -= len(last)
+        middle = parts[1:-1]
+    for part in middle:
+        pos = path.find(part, pos, end)
+        if pos < 0:
+            return False
+        pos += len(part)
+    return True
+
+
+class RobotsRules:
+    """Compiled allow/disallow rules of one user agent.
+
+    Longest-match precedence (allow wins ties) is resolved without a scan
+    over every rule. Plain path prefixes form a trie regex whose greedy
+    match is the longest matching prefix. Wildcard and $ rules are bucketed
+    by their literal text before the first "*" and, for $ rules, after the
+    last one, so only rules whose ends fit the path are tried, longest
+    first. Each is matched in linear time by _glob_match (a regex with many
+    ".*" backtracks badly on hostile robots.txt files).
+    """
+
+    def __init__(self, rules):
+        self._literal = {}
+        wildcard = {}
+        for allow, pattern in rules:
+            target = wildcard if "*" in pattern or pattern.endswith("$") else self._literal
+            target[pattern] = target.get(pattern, False) or allow
+        self._literal_re = re.compile(_trie_regex(self._literal)) if self._literal else None
+
+        # {prefix: {suffix: rules}}; the suffix is "" for rules without $
+        self._buckets = {}
+        for pattern, allow in wildcard.items():
+            anchored = pattern.endswith("$")
+            parts = (pattern[:-1] if anchored else pattern).split("*")
+            suffix = parts[-1] if anchored and len(parts) > 1 else ""
+            bucket = self._buckets.setdefault(parts[0], {})
+            bucket.setdefault(suffix, []).append((len(pattern), allow, parts, anchored))
+        self._suffix_lengths = {}
+        for prefix, bucket in self._buckets.items():
+            for rules in bucket.values():
+                rules.sort(key=lambda rule: (-rule[0], not rule[1]))
+            self._suffix_lengths[prefix] = sorted({len(suffix) for suffix in bucket})
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._buckets})
+
+    def is_allowed(self, path):
+        """Whether path (including any query string) may be crawled."""
+        best_len, allowed = 0, True
+        if self._literal_re is not None:
+            match = self._literal_re.match(path)
+            if match:
+                best_len = len(match.group(0))
+                allowed = self._literal[match.group(0)]
+        for prefix_len in self._prefix_lengths:
+            if prefix_len > len(path):
+                break
+            prefix = path[:prefix_len]
+            bucket = self._buckets.get(prefix)
+            if bucket is None:
+                continue
+            for suffix_len in self._suffix_lengths[prefix]:
+                rules = bucket.get(path[len(path) - suffix_len:] if suffix_len else "")
+                for length, allow, parts, anchored in rules or ():
+                    if length < best_len or (length == best_len and not allow):
+                        break
+                    if _glob_match(parts, anchored, path):
+                        best_len, allowed = length, allow
+                        break
+        return allowed
+
+
+class RobotsIndex:
+    """robots.txt compiled for bulk URL checks against many crawlers.
+
+    Crawlers without a group of their own fall back to the "*" group, and
+    crawlers sharing a rule set are evaluated once per URL, not once each.
+    """
+
+    def __init__(self, body, agents=ROBOTS_REPORT_AGENTS):
+        by_agent = {}
+        for group_agents, rules in parse_robots_groups(body):
+            for agent in group_agents:
+                by_agent.setdefault(agent, []).extend(rules)
+        self.agents = list(agents)
+        # Agents with identical rule sets share one compiled group, numbered
+        # so that per-URL counts do not hash whole rule lists
+        group_ids = {}
+        self._group_of = {}
+        for agent in self.agents:
+            rules = tuple(by_agent.get(agent.lower(), by_agent.get("*", [])))
+            self._group_of[agent] = group_ids.setdefault(rules, len(group_ids))
+        self._rules = {group: RobotsRules(rules) for rules, group in group_ids.items()}
+
+    def blocked_groups(self, url):
+        """Ids of the rule groups (not agents) that disallow url."""
+        path = url_path(url)
+        return [group for group, rules in self._rules.items() if not rules.is_allowed(path)]
+
+    def report(self, group_counts, urls_checked):
+        """Blocked-URL counts per crawler from per-group counts."""
+        return {
+            "urls_checked": urls_checked,
+            "by_agent": {agent: group_counts.get(self._group_of[agent], 0) for agent in self.agents},
+        }
+
+
+def robots_index_for(base_url, session):
+    """RobotsIndex for the site's robots.txt (a run-cache hit after analyze_robots)."""
+    body = fetch_simple(f"{base_url}/robots.txt", session=session, resource="robots")
+    return RobotsIndex(body) if body else None
+
+
 # --- Sitemap ---
 
-def analyze_sitemap(base_url, robots_sitemaps=None):
-    """Fetch and analyze sitemap.xml."""
+SITEMAP_URL_BUDGET = 50_000_000
+SITEMAP_MAX_DEPTH = 5
+SITEMAP_WORKERS = 8
+SITEMAP_SAMPLE_SIZE = 10
+# Distinct URLs tracked exactly (as 64-bit fingerprints) before the
+# inventory switches to a Bloom filter sized for the sitemap URL budget
+EXACT_DEDUP_LIMIT = 1_000_000
+BLOOM_ERROR_RATE = 0.01
+# Bloom filter memory cap per site; 16 MB holds about 14M URLs at 1%
+BLOOM_MAX_BYTES = 16 * 1024 * 1024
+MAX_PATH_SECTIONS = 1000
+# Upper bounds (in days) of the lastmod freshness buckets; older dates
+# fall into "older"
+FRESHNESS_BUCKETS = (7, 30, 90, 365)
+
+W3C_DATETIME_RE = re.compile(
+    r"(\d{4})(?:-(\d{2})(?:-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?"
+    r"(Z|[+-]\d{2}:?\d{2})?)?)?)?"
+)
+
+
+def _local_name(tag):
+    """Tag name without its XML namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+LOC_RE = re.compile(rb"<loc>(.*?)</loc>", re.DOTALL)
+# Raw bytes kept since the last parsed entry, for resuming after a parse error
+SCAN_BACKLOG_CHUNKS = 16
+
+
+def _scan_locs(first_chunk, stream, on_url):
+    """Regex fallback for sitemaps that are not well-formed XML.
+
+    Scans the remaining stream chunk by chunk for <loc> values, carrying
+    over the unmatched tail so entries split across chunks are not lost.
+    """
+    pending = b""
+    chunk = first_chunk
+    while chunk:
+        pending += chunk
+        end = 0
+        for match in LOC_RE.finditer(pending):
+            end = match.end()
+            loc = xml_unescape(match.group(1).decode("utf-8", errors="replace").strip())
+            if on_url(loc, None) is False:
+                return
+        pending = pending[end:][-4096:]
+        chunk = stream.read(READ_CHUNK)
+
+
+def _resume_offset(backlog, last_loc):
+    """Offset in backlog just past the <loc> of the last entry the XML parser delivered."""
+    if last_loc is None:
+        return 0
+    offset = 0
+    for match in LOC_RE.finditer(backlog):
+        if xml_unescape(match.group(1).decode("utf-8", errors="replace").strip()) == last_loc:
+            offset = match.end()
+    return offset
+
+
+def parse_sitemap_stream(stream, on_url, on_sitemap):
+    """Incrementally parse one sitemap document from a file-like stream.
+
+    Calls on_url(loc, lastmod) for every <url> entry and on_sitemap(loc)
+    for every <sitemap> entry of an index. Elements are cleared as soon as
+    they are consumed, so memory stays flat however large the document is.
+    on_url returning False stops the parse early.
+
+    A document that is not well-formed (an unescaped "&" in one <loc> is
+    common) is finished with a <loc> regex scan from the last entry the
+    parser delivered, so every URL is still counted. Returns an error string
+    when the parser gave up after some entries, else None.
+    """
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    state = {"root": None, "depth": 0, "loc": None, "lastmod": None, "entries": 0,
+             "last_loc": None, "stop": False}
+
+    def handle_events():
+        for event, elem in parser.read_events():
+            if event == "start":
+                state["depth"] += 1
+                if state["root"] is None:
+                    state["root"] = elem
+                continue
+
+            name = _local_name(elem.tag)
+            depth = state["depth"]
+            state["depth"] -= 1
+            if depth == 3 and name == "loc":
+                state["loc"] = (elem.text or "").strip()
+            elif depth == 3 and name == "lastmod":
+                state["lastmod"] = (elem.text or "").strip()
+            elif depth == 2 and name in ("url", "sitemap"):
+                state["entries"] += 1
+                loc, lastmod = state["loc"], state["lastmod"]
+                state["loc"] = state["lastmod"] = None
+                state["root"].clear()
+                if not loc:
+                    continue
+                state["last_loc"] = loc
+                if name == "sitemap":
+                    on_sitemap(loc)
+                elif on_url(loc, lastmod) is False:
+                    state["stop"] = True
+                    return
+
+    def recover(backlog, error):
+        # Scan what the parser had not turned into entries, then the rest
+        backlog = b"".join(backlog)
+        index = state["root"] is not None and _local_name(state["root"].tag) == "sitemapindex"
+        on_loc = (lambda loc, _: on_sitemap(loc)) if index else on_url
+        _scan_locs(backlog[_resume_offset(backlog, state["last_loc"]):], stream, on_loc)
+        if state["entries"]:
+            return f"XML parse error after {state['entries']} entries: {error}"
+        return None
+
+    # Chunks since (and including the one before) the last completed entry
+    backlog = []
+    first = True
+    while not state["stop"]:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        if first:
+            # Leading whitespace before the XML declaration is a common
+            # misconfiguration that expat rejects outright
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            first = False
+        entries = state["entries"]
+        backlog.append(chunk)
+        try:
+            parser.feed(chunk)
+            handle_events()
+        except ElementTree.ParseError as e:
+            return recover(backlog, e)
+        if state["entries"] != entries:
+            backlog = backlog[-2:]
+        elif len(backlog) > SCAN_BACKLOG_CHUNKS:
+            backlog.pop(0)
+
+    if not state["stop"]:
+        try:
+            parser.close()
+            handle_events()
+        except ElementTree.ParseError as e:
+            return recover(backlog, e)
+    return None
+
+
+def open_sitemap_body(resp):
+    """Return (stream, gzipped) for a sitemap response.
+
+    .xml.gz sitemaps usually arrive as a gzip payload without a gzip
+    Content-Encoding. Detect them by magic bytes, or by Content-Type when
+    the body is too short to tell, and inflate them incrementally so the
+    parser never sees (or holds) the compressed bytes.
+    """
+    head = resp.read(2)
+    content_type = (get_header(resp.headers, "Content-Type") or "").split(";")[0].strip().lower()
+    gzipped = head == GZIP_MAGIC or (len(head) < 2 and content_type in GZIP_CONTENT_TYPES)
+    stream = PrefixedStream(head, resp)
+    if gzipped:
+        return DecodedBody(stream, "gzip"), True
+    return stream, False
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_w3c_datetime(value):
+    """Parse a sitemap <lastmod> (W3C Datetime) into an aware UTC datetime.
+
+    Accepts every W3C precision from YYYY to fractional seconds. A missing
+    timezone is taken as UTC. Returns None for values that do not parse.
+    Sitemaps repeat the same few lastmod strings many times, hence the cache.
+    """
+    match = W3C_DATETIME_RE.fullmatch(value.strip())
+    if not match:
+        return None
+    year, month, day, hour, minute, second, tz = match.groups()
+    try:
+        parsed = datetime(int(year), int(month or 1), int(day or 1),
+                          int(hour or 0), int(minute or 0), int(second or 0),
+                          tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    if tz and tz != "Z":
+        offset = int(tz[1:3]) * 60 + int(tz[-2:])
+        parsed -= timedelta(minutes=offset if tz[0] == "+" else -offset)
+    return parsed
+
+
+class LastmodStats:
+    """Running lastmod statistics in constant memory.
+
+    Tracks the newest and oldest parsed lastmod (reported as the original
+    strings) and a freshness histogram relative to `now`. Not thread-safe;
+    callers serialize add().
+    """
+
+    def __init__(self, now=None):
+        self.now = now or datetime.now(timezone.utc)
+        self.newest = self.oldest = None
+        self.newest_raw = self.oldest_raw = None
+        self.unparsed = 0
+        self.future = 0
+        self.buckets = [0] * (len(FRESHNESS_BUCKETS) + 1)
+        self._bounds = [days * 86400 for days in FRESHNESS_BUCKETS]
+
+    def add(self, raw, parsed):
+        """Count one lastmod; parsed is parse_w3c_datetime(raw)."""
+        if parsed is None:
+            self.unparsed += 1
+            return
+        if self.newest is None or parsed > self.newest:
+            self.newest, self.newest_raw = parsed, raw
+        if self.oldest is None or parsed < self.oldest:
+            self.oldest, self.oldest_raw = parsed, raw
+        age = (self.now - parsed).total_seconds()
+        if age < 0:
+            self.future += 1
+            age = 0
+        self.buckets[bisect.bisect_left(self._bounds, age)] += 1
+
+    def freshness(self):
+        """Histogram as {"7d": n, "30d": n, "90d": n, "365d": n, "older": n}."""
+        labels = [f"{days}d" for days in FRESHNESS_BUCKETS] + ["older"]
+        return dict(zip(labels, self.buckets))
+
+
+def url_fingerprint(url):
+    """64-bit hash of a URL."""
+    digest = hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class FingerprintSet:
+    """Set of 64-bit fingerprints in an open-addressing array('Q') table.
+
+    A Python set of ints costs about 78 bytes per entry; this table is kept
+    at most half full, so it costs 16 to 32 bytes per fingerprint. 0 marks
+    an empty slot, so fingerprint 0 is stored as 1.
+    """
+
+    def __init__(self, capacity=1024):
+        self._table = array("Q", bytes(8 << max(10, (2 * capacity - 1).bit_length())))
+        self._mask = len(self._table) - 1
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return (fingerprint for fingerprint in self._table if fingerprint)
+
+    def add(self, fingerprint):
+        """Insert a fingerprint; returns True if it was not in the set."""
+        fingerprint = fingerprint or 1
+        table, mask = self._table, self._mask
+        i = fingerprint & mask
+        while True:
+            slot = table[i]
+            if slot == fingerprint:
+                return False
+            if not slot:
+                break
+            i = (i + 1) & mask
+        table[i] = fingerprint
+        self._len += 1
+        if 2 * self._len > len(table):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self._table
+        self._table = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._table) - 1
+        self._len = 0
+        for fingerprint in old:
+            if fingerprint:
+                self.add(fingerprint)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit fingerprints.
+
+    The probe positions come from double hashing, with the second hash
+    taken from the fingerprint scrambled by a multiplicative (Fibonacci)
+    hash; a plain rotation of it correlates the two and raises the
+    false-positive rate about 20% above the design rate.
+    """
+
+    def __init__(self, capacity=SITEMAP_URL_BUDGET, error_rate=BLOOM_ERROR_RATE, max_bytes=None):
+        bits = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        if max_bytes is not None and bits > max_bytes * 8:
+            # Tune for what fits at error_rate; past that the error rate
+            # rises, and expected_misses keeps track of it
+            bits = max_bytes * 8
+            capacity = bits * math.log(2) ** 2 / -math.log(error_rate)
+        # An odd size makes positions depend on every fingerprint bit; with
+        # a power of two only the low bits would count
+        self.size = max(8, bits) | 1
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.set_bits = 0
+        # Expected number of new fingerprints add() took for present ones
+        self.expected_misses = 0.0
+
+    def add(self, fingerprint):
+        """Set the bits of a fingerprint; returns True if they were not all set before.
+
+        A new fingerprint whose bits all happen to be set already is missed
+        with probability (set bits / size) ** hashes. Each reported-new one
+        therefore stands for 1 / (1 - rate) new fingerprints, of which
+        rate / (1 - rate) were missed; those are summed in expected_misses.
+        """
+        rate = (self.set_bits / self.size) ** self.hashes
+        flipped = 0
+        bits, size = self.bits, self.size
+        h1 = fingerprint
+        h2 = ((fingerprint * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 11 | 1
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                flipped += 1
+        if not flipped:
+            return False
+        self.set_bits += flipped
+        self.expected_misses += rate / (1 - rate)
+        return True
+
+
+class UrlInventory:
+    """Deduplicated sitemap URL counts with a uniform random sample.
+
+    URLs are kept as 64-bit fingerprints in a FingerprintSet, not strings.
+    Past `exact_limit` distinct URLs they move into a Bloom filter sized for
+    bloom_capacity URLs (the sitemap URL budget) but no larger than
+    bloom_max_bytes, so a huge budget cannot claim a huge allocation; a
+    capped filter errs more often as it fills. From then on the unique
+    count is approximate: a new URL taken for a duplicate is missed, and
+    summary() reports an upper estimate of how many were. The sample is a reservoir over distinct URLs, and distinct URLs
+    are also counted per first path section ("/blog/", "/" for top-level
+    pages). Not thread-safe; callers serialize add().
+
+    report_size (default: sample_size) is how many sampled URLs go into the
+    sitemap result; a larger sample_size keeps more for later probes.
+    """
+
+    def __init__(self, sample_size=SITEMAP_SAMPLE_SIZE, exact_limit=EXACT_DEDUP_LIMIT,
+                 bloom_capacity=SITEMAP_URL_BUDGET, rng=None, report_size=None,
+                 bloom_max_bytes=BLOOM_MAX_BYTES):
+        self.sample_size = sample_size
+        self.report_size = sample_size if report_size is None else report_size
+        self.exact_limit = exact_limit
+        self.bloom_capacity = bloom_capacity
+        self.bloom_max_bytes = bloom_max_bytes
+        self.rng = rng or random.Random()
+        self.seen = FingerprintSet()
+        self.bloom = None
+        self.unique = 0
+        self.duplicates = 0
+        self.sample = []
+        self.sections = {}
+
+    def add(self, url, fingerprint):
+        """Count one URL; fingerprint is url_fingerprint(url). Returns True if new."""
+        if self.bloom is None:
+            if not self.seen.add(fingerprint):
+                self.duplicates += 1
+                return False
+            if len(self.seen) > self.exact_limit:
+                self._switch_to_bloom()
+        elif not self.bloom.add(fingerprint):
+            self.duplicates += 1
+            return False
+
+        self.unique += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append(url)
+        else:
+            slot = self.rng.randrange(self.unique)
+            if slot < self.sample_size:
+                self.sample[slot] = url
+        section = self.section(url)
+        if section not in self.sections and len(self.sections) >= MAX_PATH_SECTIONS:
+            section = "(other)"
+        self.sections[section] = self.sections.get(section, 0) + 1
+        return True
+
+    def _switch_to_bloom(self):
+        self.bloom = BloomFilter(max(self.bloom_capacity, len(self.seen)),
+                                 max_bytes=self.bloom_max_bytes)
+        for fingerprint in self.seen:
+            self.bloom.add(fingerprint)
+        # The seeded fingerprints are known to be distinct
+        self.bloom.expected_misses = 0.0
+        self.seen = None
+
+    def max_undercount(self):
+        """New URLs the Bloom filter likely took for duplicates (expected + 3 sigma)."""
+        if self.bloom is None:
+            return 0
+        expected = self.bloom.expected_misses
+        return math.ceil(expected + 3 * math.sqrt(expected))
+
+    def draw(self, count):
+        """A uniform random subset of `count` URLs from the sample."""
+        if count >= len(self.sample):
+            return list(self.sample)
+        return self.rng.sample(self.sample, count)
+
+    @staticmethod
+    def section(url):
+        """First path segment of a URL: "/blog/" for /blog/x, "/" for /x."""
+        path = url_path(url).split("?", 1)[0]
+        end = path.find("/", 1)
+        return path[:end + 1] if end > 0 else "/"
+
+    def summary(self, top_sections=20):
+        """Counts for the sitemap result."""
+        sections = sorted(self.sections.items(), key=lambda item: -item[1])
+        return {
+            "unique_urls": self.unique,
+            "duplicate_urls": self.duplicates,
+            "unique_urls_approximate": self.bloom is not None,
+            "unique_urls_max_undercount": self.max_undercount(),
+            "path_sections": dict(sections[:top_sections]),
+            "path_sections_total": len(self.sections),
+        }
+
+
+def analyze_sitemap(base_url, robots_sitemaps=None, session=None,
+                    url_budget=SITEMAP_URL_BUDGET, workers=SITEMAP_WORKERS, robots_index=None,
+                    inventory=None):
+    """Fetch and analyze sitemap.xml, following the full sitemap-index tree.
+
+    Sitemaps are streamed and parsed incrementally, so URL counts are exact
+    for arbitrarily large sites up to url_budget; "truncated" is set when
+    the budget stops the walk early. Index children are fetched on a pool
+    of `workers` threads (the Session caps connections per host) and their
+    statistics are merged as each one completes. With a RobotsIndex, every
+    URL is also checked against robots.txt for Googlebot and the AI crawlers.
+
+    URLs listed more than once are counted once in "unique_urls", and
+    "url_samples" is a uniform sample of them. Pass a UrlInventory to choose
+    the sample size or to keep the sample for later probes.
+    """
+    if session is None:
+        with Session() as session:
+            return analyze_sitemap(base_url, robots_sitemaps, session, url_budget, workers,
+                                   robots_index, inventory)
+
     sitemap_urls = robots_sitemaps or []
     if not sitemap_urls:
         sitemap_urls = [f"{base_url}/sitemap.xml"]
@@ -176,96 +836,359 @@ def analyze_sitemap(base_url, robots_sitemaps=None):
         "lastmod_newest": None,
         "lastmod_oldest": None,
         "has_lastmod": False,
+        "lastmod_freshness": None,
+        "lastmod_unparsed": 0,
+        "lastmod_future": 0,
         "sub_sitemaps": [],
+        "sitemaps_parsed": 0,
+        "gzip_sitemaps": 0,
+        "url_budget": url_budget,
+        "truncated": False,
+        "errors": [],
+        "robots_blocked": None,
+        "partial": False,
     }
+    lock = threading.Lock()
+    blocked_counts = {}
+    lastmods = LastmodStats()
+    if inventory is None:
+        inventory = UrlInventory(bloom_capacity=url_budget)
+
+    def on_url(loc, lastmod):
+        blocked = robots_index.blocked_groups(loc) if robots_index else ()
+        parsed = parse_w3c_datetime(lastmod) if lastmod else None
+        fingerprint = url_fingerprint(loc)
+        with lock:
+            if session.expired():
+                result["partial"] = True
+                return False
+            if result["total_urls"] >= url_budget:
+                result["truncated"] = True
+                return False
+            result["total_urls"] += 1
+            for group in blocked:
+                blocked_counts[group] = blocked_counts.get(group, 0) + 1
+            inventory.add(loc, fingerprint)
+            if lastmod:
+                result["has_lastmod"] = True
+                lastmods.add(lastmod, parsed)
+        return True
+
+    def walk_one(sm_url, depth):
+        """Parse one sitemap document; returns the child sitemaps it lists."""
+        children = []
+
+        def on_sitemap(loc):
+            if depth < SITEMAP_MAX_DEPTH:
+                children.append(loc)
 
-    all_urls = []
-    lastmods = []
+        try:
+            with session.open(sm_url) as resp:
+                if resp.status != 200:
+                    return []
+                stream, gzipped = open_sitemap_body(resp)
+                stream = session.limit_body(stream, sm_url, "sitemap")
+                with lock:
+                    result["found"] = True
+                    result["sitemaps_parsed"] += 1
+                    result["gzip_sitemaps"] += int(gzipped)
+                error = parse_sitemap_stream(stream, on_url, on_sitemap)
+        except DeadlineExceeded:
+            with lock:
+                result["partial"] = True
+            return []
+        except Exception as e:
+            error = str(e)
+
+        if error:
+            with lock:
+                result["errors"].append({"url": sm_url, "error": error})
+        return children
+
+    visited = set()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        in_flight = {}
+
+        def submit(sm_url, depth):
+            if sm_url not in visited:
+                visited.add(sm_url)
+                in_flight[submit_in_context(pool, walk_one, sm_url, depth)] = depth
+
+        for sm_url in sitemap_urls:
+            submit(sm_url, 0)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = in_flight.pop(future)
+                children = future.result()
+                result["sub_sitemaps"].extend(children)
+                if result["truncated"] or result["partial"]:
+                    continue
+                for child in children:
+                    submit(child, depth + 1)
+
+    result["url_samples"] = inventory.draw(inventory.report_size)
+    result.update(inventory.summary())
+    if result["has_lastmod"]:
+        result["lastmod_newest"] = lastmods.newest_raw
+        result["lastmod_oldest"] = lastmods.oldest_raw
+        result["lastmod_freshness"] = lastmods.freshness()
+        result["lastmod_unparsed"] = lastmods.unparsed
+        result["lastmod_future"] = lastmods.future
+    if robots_index:
+        result["robots_blocked"] = robots_index.report(blocked_counts, result["total_urls"])
+    return result
 
-    for sm_url in sitemap_urls[:5]:  # Limit to 5 sitemaps
-        body = fetch_simple(sm_url)
-        if not body:
-            continue
 
-        result["found"] = True
+# --- URL liveness ---
+
+LIVENESS_WORKERS = 32
+LIVENESS_DEADLINE = 60
+LIVENESS_RATE_PER_HOST = 50
+LIVENESS_TIMEOUT = 10
+LIVENESS_SAMPLES = 20
+# Servers that reject HEAD get a GET instead
+HEAD_UNSUPPORTED = (405, 501)
+
+
+class RateLimiter:
+    """Spaces request starts so each host sees at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, hostname, deadline):
+        """Block until hostname may take another request.
+
+        Returns False, without waiting, if that time is past the deadline
+        (a time.monotonic() value).
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(hostname, now))
+            if start > deadline:
+                return False
+            self._next[hostname] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return True
+
+
+def head_url(session, url, timeout=LIVENESS_TIMEOUT):
+    """HEAD a URL (GET if HEAD is rejected) without following redirects.
+
+    Returns (status, location, latency_s, used_get).
+    """
+    start = time.perf_counter()
+    with session.request("HEAD", url, timeout=timeout) as resp:
+        status, location = resp.status, get_header(resp.headers, "Location")
+    used_get = status in HEAD_UNSUPPORTED
+    if used_get:
+        with session.request("GET", url, timeout=timeout) as resp:
+            status, location = resp.status, get_header(resp.headers, "Location")
+    return status, location, time.perf_counter() - start, used_get
+
+
+def percentiles(values, points=(50, 90, 95, 99)):
+    """Nearest-rank percentiles of values as {"p50": v, ...}, plus "max"."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f"p{p}": ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] for p in points}
+    result["max"] = ordered[-1]
+    return result
+
 
+def check_liveness(urls, session=None, workers=LIVENESS_WORKERS, deadline_s=LIVENESS_DEADLINE,
+                   rate_per_host=LIVENESS_RATE_PER_HOST, timeout=LIVENESS_TIMEOUT):
+    """HEAD every URL concurrently and summarize how they resolve.
+
+    Requests go through the session's connection pool, so the per-host
+    connection cap still applies, and each host additionally gets at most
+    rate_per_host requests per second. URLs are taken from the iterable
+    lazily, at most 2 * workers in flight. URLs not started within
+    deadline_s seconds are counted as skipped without being queued;
+    per-request timeouts shrink to fit the time left.
+    """
+    if session is None:
+        with Session() as session:
+            return check_liveness(urls, session, workers, deadline_s, rate_per_host, timeout)
+
+    started = time.monotonic()
+    deadline = started + deadline_s
+    limiter = RateLimiter(rate_per_host)
+
+    def check(url):
+        hostname = urllib.parse.urlsplit(url).hostname or ""
+        if not limiter.wait(hostname, deadline):
+            return url, None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return url, None
         try:
-            root = ElementTree.fromstring(body)
-        except ElementTree.ParseError:
-            # Try to extract URLs with regex as fallback
-            locs = re.findall(r"<loc>(.*?)</loc>", body)
-            all_urls.extend(locs[:500])
-            continue
+            return url, head_url(session, url, min(timeout, remaining))
+        except DeadlineExceeded:
+            return url, None
+        except Exception as e:
+            return url, e
 
-        ns = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+    result = {
+        "urls_checked": 0,
+        "urls_skipped": 0,
+        "status_counts": {},
+        "ok": 0,
+        "redirects": 0,
+        "not_found": 0,
+        "errors": 0,
+        "head_fallbacks": 0,
+        "redirect_samples": [],
+        "broken_samples": [],
+        "latency_ms": {},
+        "deadline_s": deadline_s,
+    }
+    latencies = []
+
+    def record(futures):
+        for future in futures:
+            url, outcome = future.result()
+            if outcome is None:
+                result["urls_skipped"] += 1
+                continue
+            result["urls_checked"] += 1
+            if isinstance(outcome, Exception):
+                result["errors"] += 1
+                if len(result["broken_samples"]) < LIVENESS_SAMPLES:
+                    result["broken_samples"].append({"url": url, "error": str(outcome)})
+                continue
+
+            status, location, latency, used_get = outcome
+            latencies.append(latency * 1000)
+            key = str(status)
+            result["status_counts"][key] = result["status_counts"].get(key, 0) + 1
+            result["head_fallbacks"] += int(used_get)
+            if 200 <= status < 300:
+                result["ok"] += 1
+            elif status in REDIRECT_CODES:
+                result["redirects"] += 1
+                if len(result["redirect_samples"]) < LIVENESS_SAMPLES:
+                    result["redirect_samples"].append(
+                        {"url": url, "status": status, "location": location})
+            elif status >= 400:
+                result["not_found"] += int(status == 404)
+                if len(result["broken_samples"]) < LIVENESS_SAMPLES:
+                    result["broken_samples"].append({"url": url, "status": status})
+
+    window = 2 * max(1, workers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        in_flight = set()
+        pending = iter(urls)
+        for submitted, url in enumerate(pending):
+            if time.monotonic() >= deadline:
+                if hasattr(urls, "__len__"):
+                    result["urls_skipped"] += len(urls) - submitted
+                else:
+                    result["urls_skipped"] += 1 + sum(1 for _ in pending)
+                break
+            if len(in_flight) >= window:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                record(done)
+            in_flight.add(submit_in_context(pool, check, url))
+        record(as_completed(in_flight))
+
+    result["latency_ms"] = {k: round(v, 1) for k, v in percentiles(latencies).items()}
+    result["elapsed_s"] = round(time.monotonic() - started, 2)
+    return result
 
-        # Check if this is a sitemap index
-        sub_sitemaps = root.findall(".//sm:sitemap", ns) or root.findall(
-            ".//{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap"
-        )
-        if sub_sitemaps:
-            for sub in sub_sitemaps:
-                loc = sub.find("sm:loc", ns)
-                if loc is None:
-                    loc = sub.find("{http://www.sitemaps.org/schemas/sitemap/0.9}loc")
-                if loc is not None and loc.text:
-                    result["sub_sitemaps"].append(loc.text)
-            # Recurse into first 3 sub-sitemaps
-            for sub_url in result["sub_sitemaps"][:3]:
-                sub_body = fetch_simple(sub_url)
-                if not sub_body:
-                    continue
-                try:
-                    sub_root = ElementTree.fromstring(sub_body)
-                    for url_el in sub_root.findall(".//sm:url", ns) or sub_root.findall(
-                        ".//{http://www.sitemaps.org/schemas/sitemap/0.9}url"
-                    ):
-                        loc = url_el.find("sm:loc", ns)
-                        if loc is None:
-                            loc = url_el.find("{http://www.sitemaps.org/schemas/sitemap/0.9}loc")
-                        if loc is not None and loc.text:
-                            all_urls.append(loc.text)
-                        lastmod = url_el.find("sm:lastmod", ns)
-                        if lastmod is None:
-                            lastmod = url_el.find("{http://www.sitemaps.org/schemas/sitemap/0.9}lastmod")
-                        if lastmod is not None and lastmod.text:
-                            lastmods.append(lastmod.text)
-                except ElementTree.ParseError:
-                    pass
-            continue
 
-        # Regular sitemap
-        for url_el in root.findall(".//sm:url", ns) or root.findall(
-            ".//{http://www.sitemaps.org/schemas/sitemap/0.9}url"
-        ):
-            loc = url_el.find("sm:loc", ns)
-            if loc is None:
-                loc = url_el.find("{http://www.sitemaps.org/schemas/sitemap/0.9}loc")
-            if loc is not None and loc.text:
-                all_urls.append(loc.text)
-            lastmod = url_el.find("sm:lastmod", ns)
-            if lastmod is None:
-                lastmod = url_el.find("{http://www.sitemaps.org/schemas/sitemap/0.9}lastmod")
-            if lastmod is not None and lastmod.text:
-                lastmods.append(lastmod.text)
-
-    result["total_urls"] = len(all_urls)
-    result["url_samples"] = all_urls[:10]
-    result["has_lastmod"] = len(lastmods) > 0
-
-    if lastmods:
-        sorted_mods = sorted(lastmods)
-        result["lastmod_newest"] = sorted_mods[-1]
-        result["lastmod_oldest"] = sorted_mods[0]
+# --- Scheme/host variants ---
 
+def url_variants(base_url):
+    """The http/https x www/non-www entry points of a site, as base URLs.
+
+    IP addresses and single-label hosts only get the two scheme variants.
+    """
+    parts = urllib.parse.urlsplit(base_url)
+    hostname = parts.hostname or ""
+    port = f":{parts.port}" if parts.port else ""
+    try:
+        ipaddress.ip_address(hostname)
+        hosts = [hostname]
+    except ValueError:
+        apex = hostname[4:] if hostname.startswith("www.") else hostname
+        hosts = [apex, f"www.{apex}"] if "." in apex else [apex]
+    return [f"{scheme}://{host}{port}/" for host in hosts for scheme in ("http", "https")]
+
+
+def follow_variant(session, url, timeout=LIVENESS_TIMEOUT):
+    """Follow one entry point's redirects with HEAD (GET where HEAD is refused).
+
+    Each hop records its status, Location and latency, so the cost of a
+    redirect chain is visible next to where it ends.
+    """
+    hops = []
+    seen = set()
+    result = {"url": url, "hops": hops, "final_url": None, "final_status": None}
+    current = url
+    try:
+        for _ in range(MAX_REDIRECTS):
+            seen.add(current)
+            status, location, latency, used_get = head_url(session, current, timeout)
+            hops.append({
+                "url": current,
+                "status": status,
+                "location": location,
+                "latency_ms": round(latency * 1000, 1),
+                "method": "GET" if used_get else "HEAD",
+            })
+            if status not in REDIRECT_CODES or not location:
+                result["final_url"], result["final_status"] = current, status
+                break
+            current = urllib.parse.urljoin(current, location)
+            if current in seen:
+                result["error"] = f"Redirect loop at {current}"
+                break
+        else:
+            result["error"] = "Too many redirects"
+    except Exception as e:
+        result["error"] = str(e)
+    result["redirects"] = sum(1 for hop in hops if hop["status"] in REDIRECT_CODES)
+    result["total_ms"] = round(sum(hop["latency_ms"] for hop in hops), 1)
     return result
 
 
+def probe_variants(base_url, session=None):
+    """Follow the redirect chain of every scheme/host variant concurrently.
+
+    "consistent" is True when every variant ends on the same URL with a
+    200, i.e. the site canonicalizes to a single entry point.
+    """
+    if session is None:
+        with Session() as session:
+            return probe_variants(base_url, session)
+
+    variants = url_variants(base_url)
+    with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+        futures = [submit_in_context(pool, follow_variant, session, url) for url in variants]
+        chains = [future.result() for future in futures]
+
+    finals = {chain["final_url"] for chain in chains if chain["final_status"] == 200}
+    canonical_url = next(iter(finals)) if len(finals) == 1 else None
+    return {
+        "variants": chains,
+        "canonical_url": canonical_url,
+        "consistent": canonical_url is not None
+                      and all(chain["final_status"] == 200 for chain in chains),
+    }
+
+
 # --- Security Headers ---
 
-def analyze_security_headers(base_url):
+def analyze_security_headers(base_url, session=None):
     """Analyze HTTP security headers."""
-    _, headers, status, redirect_chain = fetch_url(base_url)
+    _, headers, status, redirect_chain = fetch_url(base_url, session=session)
     if not headers:
         return {"error": "Could not fetch headers", "redirect_chain": redirect_chain}
 
@@ -356,15 +1279,21 @@ def analyze_security_headers(base_url):
 
 # --- SSL Certificate ---
 
-def analyze_ssl(hostname):
-    """Analyze SSL certificate."""
+def analyze_ssl(hostname, session=None):
+    """Analyze SSL certificate.
+
+    Reads the handshake details captured by the session's HTTPS
+    connections instead of dialing the host again.
+    """
+    if session is None:
+        with Session() as session:
+            return analyze_ssl(hostname, session)
+
     try:
-        context = ssl.create_default_context()
-        with socket.create_connection((hostname, 443), timeout=10) as sock:
-            with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                cert = ssock.getpeercert()
-                cipher = ssock.cipher()
-                protocol = ssock.version()
+        peer = session.tls_details(hostname, timeout=10)
+        cert = peer["cert"]
+        cipher = peer["cipher"]
+        protocol = peer["protocol"]
 
         subject = dict(x[0] for x in cert.get("subject", []))
         issuer = dict(x[0] for x in cert.get("issuer", []))
@@ -409,12 +1338,170 @@ def analyze_ssl(hostname):
 
 # --- Technology Detection ---
 
-def detect_technology(base_url, headers, body):
-    """Detect CMS, framework, hosting, and CDN from headers and HTML."""
+# (category, source, pattern, name). Patterns are case-insensitive literals
+# matched against the HTML body or the response headers ("key\0value").
+# Order matters: the first cms/framework hit names the stack, the last CDN
+# header hit names the CDN, and CDN body patterns are only a fallback.
+TECH_FINGERPRINTS = [
+    ("cms", "body", '<meta name="generator" content="WordPress', "WordPress"),
+    ("cms", "body", "wp-content/", "WordPress"),
+    ("cms", "body", "wp-includes/", "WordPress"),
+    ("cms", "body", "Shopify.theme", "Shopify"),
+    ("cms", "body", "cdn.shopify.com", "Shopify"),
+    ("cms", "body", "myshopify.com", "Shopify"),
+    ("cms", "body", '<meta name="generator" content="Drupal', "Drupal"),
+    ("cms", "body", "/sites/default/files", "Drupal"),
+    ("cms", "body", '<meta name="generator" content="Joomla', "Joomla"),
+    ("cms", "body", "Squarespace", "Squarespace"),
+    ("cms", "body", "static1.squarespace.com", "Squarespace"),
+    ("cms", "body", "Wix.com", "Wix"),
+    ("cms", "body", "wixsite.com", "Wix"),
+    ("cms", "body", "static.wixstatic.com", "Wix"),
+    ("cms", "body", "Webflow", "Webflow"),
+    ("cms", "body", "assets.website-files.com", "Webflow"),
+    ("cms", "body", "GhostContentAPI", "Ghost"),
+    ("cms", "body", '<meta name="generator" content="Hugo', "Hugo"),
+    ("cms", "body", "payload", "Payload CMS"),
+    ("cms", "body", "next/static", "Next.js"),
+    ("cms", "body", "__next", "Next.js"),
+    ("cms", "body", "_next/static", "Next.js"),
+    ("cms", "body", "gatsby", "Gatsby"),
+    ("cms", "body", "Framer", "Framer"),
+    ("framework", "body", "__next", "Next.js"),
+    ("framework", "body", "_next/", "Next.js"),
+    ("framework", "body", 'id="__nuxt"', "Nuxt.js"),
+    ("framework", "body", "_nuxt/", "Nuxt.js"),
+    ("framework", "body", "ng-version", "Angular"),
+    ("framework", "body", "react", "React"),
+    ("framework", "body", "__vue", "Vue.js"),
+    ("framework", "body", "svelte", "SvelteKit"),
+    ("framework", "body", "astro", "Astro"),
+    ("cdn", "header", "cloudflare", "Cloudflare"),
+    ("cdn", "header", "akamai", "Akamai"),
+    ("cdn", "header", "fastly", "Fastly"),
+    ("cdn", "header", "cloudfront", "CloudFront (AWS)"),
+    ("cdn", "header", "vercel", "Vercel"),
+    ("cdn", "header", "netlify", "Netlify"),
+    ("cdn", "header", "x-vercel", "Vercel"),
+    ("cdn", "header", "x-nf-", "Netlify"),
+    ("cdn", "body", "cdn.cloudflare.com", "Cloudflare"),
+    ("cdn", "body", "cloudflareinsights", "Cloudflare"),
+    ("cdn", "body", "vercel.app", "Vercel"),
+]
+
+TECH_SIGNAL_FORMATS = {
+    ("cms", "body"): "CMS: {name} (HTML pattern)",
+    ("framework", "body"): "Framework: {name}",
+    ("cdn", "header"): "CDN: {name} (header: {header})",
+    ("cdn", "body"): "CDN: {name} (body pattern)",
+}
+
+
+def load_fingerprints(path):
+    """Load a fingerprint table from a JSON list of {category, source, pattern, name}."""
+    entries = json.loads(Path(path).read_text())
+    return [(e["category"], e["source"], e["pattern"], e["name"]) for e in entries]
+
+
+def _trie_regex(literals):
+    """Regex source matching any of the literals, shaped as a prefix trie.
+
+    Alternatives sharing a prefix are merged, so the engine follows one
+    branch per character instead of trying every literal in turn. Longer
+    continuations are tried first, so each match is the longest literal
+    starting at that position.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        source = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{source})?" if "" in node else source
+
+    return build(trie)
+
+
+class LiteralMatcher:
+    """Finds every occurrence-start of a set of literals in one regex pass.
+
+    The trie regex sits inside a zero-width lookahead, so every position of
+    the text is tried once and overlapping literals are not swallowed. A
+    position reports its longest literal; shorter literals starting there
+    are recovered from that literal's prefixes.
+    """
+
+    def __init__(self, literals):
+        literals = {literal.lower() for literal in literals if literal}
+        self._prefixes = {
+            literal: [literal[:i] for i in range(1, len(literal) + 1) if literal[:i] in literals]
+            for literal in literals
+        }
+        self._regex = re.compile(f"(?=({_trie_regex(literals)}))") if literals else None
+
+    def find(self, text):
+        """Return {literal: offset of its first occurrence} for every literal in text."""
+        found = {}
+        if self._regex is None or not text:
+            return found
+        for match in self._regex.finditer(text.lower()):
+            hit = match.group(1)
+            if hit in found:
+                continue
+            for literal in self._prefixes[hit]:
+                found.setdefault(literal, match.start())
+        return found
+
+
+class FingerprintEngine:
+    """A compiled fingerprint table: one LiteralMatcher per source."""
+
+    def __init__(self, fingerprints=TECH_FINGERPRINTS):
+        self.fingerprints = [
+            (category, source, pattern.lower(), name)
+            for category, source, pattern, name in fingerprints
+        ]
+        self._entries = {"body": {}, "header": {}}
+        for index, (category, source, pattern, name) in enumerate(self.fingerprints):
+            self._entries[source].setdefault(pattern, []).append(index)
+        self.matchers = {source: LiteralMatcher(entries) for source, entries in self._entries.items()}
+
+    def match(self, source, text):
+        """Return [(table_index, offset)] for every fingerprint of `source` found in text."""
+        hits = []
+        for literal, offset in self.matchers[source].find(text).items():
+            hits.extend((index, offset) for index in self._entries[source][literal])
+        return sorted(hits)
+
+
+_default_engine = None
+
+
+def default_fingerprint_engine():
+    """The engine for TECH_FINGERPRINTS, compiled on first use."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = FingerprintEngine()
+    return _default_engine
+
+
+def detect_technology(base_url, headers, body, engine=None):
+    """Detect CMS, framework, hosting, and CDN from headers and HTML.
+
+    The body and the headers are each scanned once, whatever the size of
+    the fingerprint table.
+    """
     if not body:
         body = ""
     if not headers:
         headers = {}
+    engine = engine or default_fingerprint_engine()
 
     h = {k.lower(): v for k, v in headers.items()}
     tech = {
@@ -426,89 +1513,46 @@ def detect_technology(base_url, headers, body):
         "signals": [],
     }
 
-    # CMS detection
-    cms_patterns = [
-        (r'<meta name="generator" content="WordPress', "WordPress"),
-        (r"wp-content/", "WordPress"),
-        (r"wp-includes/", "WordPress"),
-        (r"Shopify\.theme", "Shopify"),
-        (r"cdn\.shopify\.com", "Shopify"),
-        (r"myshopify\.com", "Shopify"),
-        (r'<meta name="generator" content="Drupal', "Drupal"),
-        (r"/sites/default/files", "Drupal"),
-        (r'<meta name="generator" content="Joomla', "Joomla"),
-        (r"Squarespace", "Squarespace"),
-        (r"static1\.squarespace\.com", "Squarespace"),
-        (r"Wix\.com", "Wix"),
-        (r"wixsite\.com", "Wix"),
-        (r"static\.wixstatic\.com", "Wix"),
-        (r"Webflow", "Webflow"),
-        (r"assets\.website-files\.com", "Webflow"),
-        (r"GhostContentAPI", "Ghost"),
-        (r'<meta name="generator" content="Hugo', "Hugo"),
-        (r"payload", "Payload CMS"),
-        (r"next/static", "Next.js"),
-        (r"__next", "Next.js"),
-        (r"_next/static", "Next.js"),
-        (r"gatsby", "Gatsby"),
-        (r"Framer", "Framer"),
-    ]
-
-    for pattern, name in cms_patterns:
-        if re.search(pattern, body, re.IGNORECASE):
-            if not tech["cms"]:
-                tech["cms"] = name
-            tech["signals"].append(f"CMS: {name} (HTML pattern)")
-
-    # Framework detection
-    fw_patterns = [
-        (r"__next", "Next.js"),
-        (r"_next/", "Next.js"),
-        (r'id="__nuxt"', "Nuxt.js"),
-        (r"_nuxt/", "Nuxt.js"),
-        (r"ng-version", "Angular"),
-        (r"react", "React"),
-        (r"__vue", "Vue.js"),
-        (r"svelte", "SvelteKit"),
-        (r"astro", "Astro"),
-    ]
+    def signal(category, source, name, header=None):
+        template = TECH_SIGNAL_FORMATS.get((category, source))
+        if template is None:
+            template = f"{category.title()}: {{name}}" + (" (header: {header})" if header else "")
+        tech["signals"].append(template.format(name=name, header=header))
 
-    for pattern, name in fw_patterns:
-        if re.search(pattern, body, re.IGNORECASE):
-            if not tech["framework"]:
-                tech["framework"] = name
-            tech["signals"].append(f"Framework: {name}")
-
-    # CDN detection
-    cdn_signals = {
-        "cloudflare": "Cloudflare",
-        "akamai": "Akamai",
-        "fastly": "Fastly",
-        "cloudfront": "CloudFront (AWS)",
-        "vercel": "Vercel",
-        "netlify": "Netlify",
-        "x-vercel": "Vercel",
-        "x-nf-": "Netlify",
-    }
+    body_hits = engine.match("body", body)
 
-    for key, cdn_name in cdn_signals.items():
-        for header_key, header_val in h.items():
-            if key in header_key.lower() or key in str(header_val).lower():
-                tech["cdn"] = cdn_name
-                tech["signals"].append(f"CDN: {cdn_name} (header: {header_key})")
-                break
-
-    # Also check body for CDN patterns
+    # HTML patterns: the first hit per category wins, every hit is a signal
+    for index, _ in body_hits:
+        category, source, _, name = engine.fingerprints[index]
+        if category == "cdn":
+            continue
+        if not tech.get(category):
+            tech[category] = name
+        signal(category, source, name)
+
+    # Header patterns match the key or the value; report the first header hit
+    header_keys = list(h)
+    header_lines = [f"{k}\0{str(v).lower()}" for k, v in h.items()]
+    header_starts = []
+    offset = 0
+    for line in header_lines:
+        header_starts.append(offset)
+        offset += len(line) + 1
+    header_text = "\n".join(header_lines)
+    for index, offset in engine.match("header", header_text):
+        category, source, _, name = engine.fingerprints[index]
+        header = header_keys[bisect.bisect_right(header_starts, offset) - 1]
+        if category == "cdn" or not tech.get(category):
+            tech[category] = name
+        signal(category, source, name, header)
+
+    # CDN body patterns are a fallback when no header named the CDN
     if not tech["cdn"]:
-        cdn_body_patterns = [
-            (r"cdn\.cloudflare\.com", "Cloudflare"),
-            (r"cloudflareinsights", "Cloudflare"),
-            (r"vercel\.app", "Vercel"),
-        ]
-        for pattern, name in cdn_body_patterns:
-            if re.search(pattern, body, re.IGNORECASE):
+        for index, _ in body_hits:
+            category, source, _, name = engine.fingerprints[index]
+            if category == "cdn":
                 tech["cdn"] = name
-                tech["signals"].append(f"CDN: {name} (body pattern)")
+                signal(category, source, name)
                 break
 
     # Hosting detection from headers/server
@@ -532,29 +1576,57 @@ def detect_technology(base_url, headers, body):
 
 # --- DNS ---
 
-def check_dns(hostname):
-    """Basic DNS resolution check."""
+def check_dns(hostname, session=None):
+    """Basic DNS resolution check (shares the session's cached lookup)."""
+    host_context = session.host(hostname) if session else HostContext(hostname)
     try:
-        ips = socket.getaddrinfo(hostname, None)
+        ips = host_context.resolve(session.timeout(DNS_TIMEOUT) if session else DNS_TIMEOUT)
         ipv4 = list(set(addr[4][0] for addr in ips if addr[0] == socket.AF_INET))
         ipv6 = list(set(addr[4][0] for addr in ips if addr[0] == socket.AF_INET6))
         return {"resolved": True, "ipv4": ipv4[:5], "ipv6": ipv6[:5]}
-    except socket.gaierror:
+    except (socket.gaierror, TimeoutError):
         return {"resolved": False}
 
 
 # --- Main ---
 
-def collect(url):
-    """Collect all public data for a URL."""
+def collect(url, concurrent=True, sitemap_url_budget=SITEMAP_URL_BUDGET,
+            sitemap_workers=SITEMAP_WORKERS, max_per_host=MAX_PER_HOST,
+            host_limiter=None, verbose=True, fingerprint_engine=None, body_budgets=None,
+            disk_cache=None, sitemap_sample_size=SITEMAP_SAMPLE_SIZE, liveness_sample=0,
+            liveness_deadline=LIVENESS_DEADLINE, liveness_rate=LIVENESS_RATE_PER_HOST,
+            deadline_s=None, trace=False, bloom_max_bytes=BLOOM_MAX_BYTES):
+    """Collect all public data for a URL.
+
+    With concurrent=True the independent probes run on a thread pool, so the
+    wall-clock time is roughly that of the slowest probe. The resulting dict
+    matches the sequential run, apart from the random sitemap URL sample.
+
+    With liveness_sample > 0, that many randomly sampled sitemap URLs are
+    then checked with HEAD requests (see check_liveness) and reported
+    under "liveness".
+
+    bloom_max_bytes caps the memory of the sitemap URL Bloom filter (see
+    UrlInventory).
+
+    deadline_s caps the whole run: every fetch, handshake and parse gets
+    only the time left, and sections cut short (or never started) are
+    marked "partial" and listed in "partial_sections".
+
+    "timing" breaks the run down per probe: wall time, requests, body bytes
+    and DNS/connect/TLS/TTFB/download milliseconds. With trace=True the
+    individual events are returned under "trace".
+    """
+    deadline = time.monotonic() + deadline_s if deadline_s else None
+    log = print if verbose else _quiet
     base_url = normalize_url(url)
     parsed = urllib.parse.urlparse(base_url)
     hostname = parsed.hostname
 
-    print(f"Teaser Collector")
-    print(f"URL: {base_url}")
-    print(f"Host: {hostname}")
-    print()
+    log(f"Teaser Collector")
+    log(f"URL: {base_url}")
+    log(f"Host: {hostname}")
+    log()
 
     result = {
         "url": base_url,
@@ -562,43 +1634,392 @@ def collect(url):
         "collected_at": datetime.now(timezone.utc).isoformat(),
     }
 
-    # Fetch main page for tech detection
-    print("  Fetching main page...")
-    body, headers, status, redirect_chain = fetch_url(base_url)
+    metrics = RunMetrics(trace=trace)
+    with Session(max_per_host=max_per_host, host_limiter=host_limiter,
+                 body_budgets=body_budgets, disk_cache=disk_cache, deadline=deadline,
+                 metrics=metrics) as session:
+        # A liveness check can start at most this many HEADs against one host
+        # before its deadline, so a larger sample ("--liveness all") is never held
+        liveness_capacity = liveness_sample
+        if liveness_rate:
+            liveness_capacity = max(1, math.ceil(liveness_deadline * liveness_rate))
+        inventory = UrlInventory(sample_size=max(sitemap_sample_size,
+                                                 min(liveness_sample, liveness_capacity)),
+                                 bloom_capacity=sitemap_url_budget,
+                                 bloom_max_bytes=bloom_max_bytes,
+                                 report_size=sitemap_sample_size)
+
+        def probe_sitemap(robots):
+            return analyze_sitemap(
+                base_url, _robots_sitemaps(robots), session,
+                url_budget=sitemap_url_budget,
+                workers=sitemap_workers if concurrent else 1,
+                robots_index=robots_index_for(base_url, session) if robots.get("found") else None,
+                inventory=inventory,
+            )
+
+        partial = set()
+        if concurrent:
+            sections = _run_probes_concurrently(base_url, hostname, session, probe_sitemap, log,
+                                                partial)
+        else:
+            sections = _run_probes_sequentially(base_url, hostname, session, probe_sitemap, log,
+                                                partial)
+        if liveness_sample:
+            log("  Checking sitemap URL liveness...")
+            remaining = session.remaining()
+            liveness_deadline_s = (liveness_deadline if remaining is None
+                                   else min(liveness_deadline, remaining))
+            urls = inventory.draw(min(liveness_sample, liveness_capacity))
+            liveness = sections["liveness"] = _timed_probe(
+                metrics, "liveness", check_liveness, urls, session,
+                workers=LIVENESS_WORKERS if concurrent else 1,
+                deadline_s=liveness_deadline_s,
+                rate_per_host=liveness_rate,
+            )
+            # URLs beyond what the rate limit allowed in the window were never drawn
+            liveness["urls_skipped"] += max(0, min(liveness_sample, inventory.unique) - len(urls))
+            if session.expired():
+                partial.add("liveness")
+        http_cache = session.cache.stats()
+        connections = session.connection_stats()
+        if disk_cache is not None:
+            http_cache["disk"] = disk_cache.stats()
+        truncated_bodies = session.truncated_bodies
+
+    if sections["sitemap"].get("partial"):
+        partial.add("sitemap")
+    for name in partial:
+        if isinstance(sections[name], dict):
+            sections[name]["partial"] = True
+
+    body, headers, status, redirect_chain = sections["main_page"]
     result["main_page"] = {
         "status": status,
         "redirect_chain": redirect_chain,
     }
+    if "main_page" in partial:
+        result["main_page"]["partial"] = True
+    result["robots"] = sections["robots"]
+    result["sitemap"] = sections["sitemap"]
+    if "liveness" in sections:
+        result["liveness"] = sections["liveness"]
+    result["security"] = sections["security"]
+    result["ssl"] = sections["ssl"]
+    log("  Detecting technology stack...")
+    result["technology"] = _timed_probe(metrics, "technology", detect_technology,
+                                        base_url, headers, body, fingerprint_engine)
+    result["dns"] = sections["dns"]
+    result["variants"] = sections["variants"]
+    result["http_cache"] = http_cache
+    result["truncated_bodies"] = truncated_bodies
+    result["connections"] = connections
+    result["deadline_s"] = deadline_s
+    result["partial_sections"] = sorted(partial)
+    result["timing"] = metrics.summary()
+    if trace:
+        result["trace"] = metrics.trace
 
-    print("  Analyzing robots.txt...")
-    result["robots"] = analyze_robots(base_url)
+    return result
 
-    print("  Analyzing sitemap...")
-    robots_sitemaps = result["robots"].get("sitemaps", []) if result["robots"].get("found") else None
-    result["sitemap"] = analyze_sitemap(base_url, robots_sitemaps)
 
-    print("  Checking security headers...")
-    result["security"] = analyze_security_headers(base_url)
+def _quiet(*args):
+    """Stand-in for print() when progress output is disabled."""
 
-    print("  Checking SSL certificate...")
-    result["ssl"] = analyze_ssl(hostname)
 
-    print("  Detecting technology stack...")
-    result["technology"] = detect_technology(base_url, headers, body)
+def _robots_sitemaps(robots):
+    """Sitemap URLs declared in robots.txt, or None if robots.txt was not found."""
+    return robots.get("sitemaps", []) if robots.get("found") else None
 
-    print("  Resolving DNS...")
-    result["dns"] = check_dns(hostname)
 
-    return result
+# Seconds past the deadline a concurrent probe may take to return partial results
+DEADLINE_GRACE = 0.5
+
+
+def _timed_probe(metrics, name, probe, *args, **kwargs):
+    """Run probe with CURRENT_PROBE set to name and record its wall time."""
+    token = CURRENT_PROBE.set(name)
+    start = time.perf_counter()
+    try:
+        return probe(*args, **kwargs)
+    finally:
+        metrics.wall(name, time.perf_counter() - start)
+        CURRENT_PROBE.reset(token)
+
+
+def _deadline_placeholder(name):
+    """Section value for a probe the run deadline did not leave time for."""
+    if name == "main_page":
+        return None, {}, 0, []
+    return {"error": "Run deadline exceeded"}
+
+
+def _run_probes_sequentially(base_url, hostname, session, probe_sitemap, log=print,
+                             partial=None):
+    """Run every network probe one after another.
+
+    Probes still running when the session deadline passes, or not started
+    by then, are added to `partial`.
+    """
+    partial = set() if partial is None else partial
+    sections = {}
+
+    def run(name, message, probe, *args, **kwargs):
+        if session.expired():
+            partial.add(name)
+            sections[name] = _deadline_placeholder(name)
+            return
+        log(message)
+        sections[name] = _timed_probe(session.metrics, name, probe, *args, **kwargs)
+        if session.expired():
+            partial.add(name)
+
+    run("main_page", "  Fetching main page...", fetch_url, base_url, session=session)
+    run("robots", "  Analyzing robots.txt...", analyze_robots, base_url, session)
+    run("sitemap", "  Analyzing sitemap...", probe_sitemap, sections["robots"])
+    run("security", "  Checking security headers...", analyze_security_headers, base_url, session)
+    run("ssl", "  Checking SSL certificate...", analyze_ssl, hostname, session)
+    run("dns", "  Resolving DNS...", check_dns, hostname, session)
+    run("variants", "  Probing http/https and www variants...", probe_variants, base_url, session)
+
+    return sections
+
+
+def _run_probes_concurrently(base_url, hostname, session, probe_sitemap, log=print,
+                             partial=None):
+    """Run the network probes in parallel; the sitemap waits only on robots.txt.
+
+    With a session deadline, probes get DEADLINE_GRACE seconds past it to
+    wrap up what they have; later ones get a placeholder. Either way they
+    are added to `partial`.
+    """
+    partial = set() if partial is None else partial
+    pool = ThreadPoolExecutor(max_workers=7)
+
+    def submit(name, probe, *args, **kwargs):
+        def run():
+            value = _timed_probe(session.metrics, name, probe, *args, **kwargs)
+            return value, session.expired()
+        return pool.submit(run)
+
+    try:
+        log("  Fetching main page, robots.txt, security headers, SSL, DNS and URL variants...")
+        futures = {
+            "main_page": submit("main_page", fetch_url, base_url, session=session),
+            "robots": submit("robots", analyze_robots, base_url, session),
+            "security": submit("security", analyze_security_headers, base_url, session),
+            "ssl": submit("ssl", analyze_ssl, hostname, session),
+            "dns": submit("dns", check_dns, hostname, session),
+            "variants": submit("variants", probe_variants, base_url, session),
+        }
+
+        def sitemap_after_robots():
+            robots, _ = futures["robots"].result()
+            log("  Analyzing sitemap...")
+            return probe_sitemap(robots)
+
+        futures["sitemap"] = submit("sitemap", sitemap_after_robots)
+
+        sections = {}
+        for name, future in futures.items():
+            remaining = session.remaining()
+            try:
+                sections[name], late = future.result(
+                    timeout=None if remaining is None else remaining + DEADLINE_GRACE)
+            except FutureTimeoutError:
+                sections[name], late = _deadline_placeholder(name), True
+            if late:
+                partial.add(name)
+    finally:
+        # Every socket wait is cut to the deadline, so late probes finish
+        # promptly; waiting for them keeps their threads from outliving the
+        # session (and piling up across domains in bulk mode)
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    return sections
+
+
+# --- Bulk mode ---
+
+BULK_WORKERS = 32
+# Per-site Bloom filter cap in bulk mode, where every worker may hold one
+# (4 MB holds about 3.5M URLs at 1%)
+BULK_BLOOM_MAX_BYTES = 4 * 1024 * 1024
+
+
+def read_domains(path):
+    """Yield normalized URLs from a domains file, skipping blanks, # comments and repeats."""
+    seen = set()
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            url = normalize_url(line)
+            if url not in seen:
+                seen.add(url)
+                yield url
+
+
+def collect_bulk(urls, output_file, workers=BULK_WORKERS, max_per_host=MAX_PER_HOST, trace_file=None,
+                 **collect_kwargs):
+    """Audit many URLs on a worker pool, streaming one JSON line per URL.
+
+    Lines are written in completion order as soon as each URL finishes, so a
+    slow host never holds back the rest of the batch. At most `workers` URLs
+    are audited at once, and one HostLimiter caps connections per hostname
+    across the whole batch. URLs are read lazily, so the input can be
+    arbitrarily long. A URL whose audit raises is written as {"url", "error"}.
+    Each site's Bloom filter is capped at BULK_BLOOM_MAX_BYTES unless
+    collect_kwargs sets bloom_max_bytes.
+    With trace_file, the trace events of every URL are written there as JSON
+    lines, each tagged with its URL under "site", instead of into the records.
+    Returns {"done": n, "failed": n, "elapsed_s": seconds}.
+    """
+    limiter = HostLimiter(max_per_host)
+    stats = {"done": 0, "failed": 0}
+    collect_kwargs.setdefault("bloom_max_bytes", BULK_BLOOM_MAX_BYTES)
+    if trace_file is not None:
+        collect_kwargs["trace"] = True
+    started = time.monotonic()
+
+    def run_one(url):
+        try:
+            return collect(url, host_limiter=limiter, verbose=False, **collect_kwargs)
+        except Exception as e:
+            return {"url": url, "error": f"{type(e).__name__}: {e}"}
+
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(output_path.open("w"))
+        trace_out = stack.enter_context(open(trace_file, "w")) if trace_file is not None else None
+        pool = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+
+        def write(futures):
+            for future in futures:
+                data = future.result()
+                if trace_out is not None:
+                    for event in data.pop("trace", []):
+                        trace_out.write(json.dumps({"site": data["url"], **event}) + "\n")
+                out.write(json.dumps(data) + "\n")
+                out.flush()
+                stats["failed" if "error" in data else "done"] += 1
+                print(f"  [{stats['done'] + stats['failed']}] {data['url']}"
+                      f"{' — ' + data['error'] if 'error' in data else ''}")
+
+        in_flight = set()
+        for url in urls:
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                write(done)
+            in_flight.add(pool.submit(run_one, url))
+        write(as_completed(in_flight))
+
+    stats["elapsed_s"] = round(time.monotonic() - started, 1)
+    return stats
+
+
+def parse_body_budgets(specs):
+    """Parse ["html=262144", "sitemap=0"] into a budgets dict (0 = unlimited)."""
+    budgets = {}
+    for spec in specs:
+        resource, _, value = spec.partition("=")
+        if resource not in BODY_BUDGETS or not value.isdigit():
+            raise SystemExit(f"Invalid --body-budget {spec!r}; expected one of "
+                             f"{', '.join(BODY_BUDGETS)}=<bytes>")
+        budgets[resource] = int(value) or None
+    return budgets
+
+
+def parse_liveness_sample(value):
+    """--liveness value: a URL count, or "all" for every URL up to the sitemap budget."""
+    if value == "all":
+        return SITEMAP_URL_BUDGET
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number or 'all', got {value!r}")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Teaser Data Collector")
-    parser.add_argument("url", help="URL to analyze")
-    parser.add_argument("output_file", help="Output JSON file path")
+    parser.add_argument("url", help="URL to analyze (with --bulk: file with one domain per line)")
+    parser.add_argument("output_file", help="Output JSON file path (with --bulk: JSONL file)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Audit every domain listed in the input file, one JSON line each")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS,
+                        help=f"Domains audited concurrently in --bulk mode (default: {BULK_WORKERS})")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Run probes one after another instead of concurrently")
+    parser.add_argument("--sitemap-url-budget", type=int, default=SITEMAP_URL_BUDGET,
+                        help=f"Stop counting sitemap URLs after this many (default: {SITEMAP_URL_BUDGET:,})")
+    parser.add_argument("--sitemap-workers", type=int, default=SITEMAP_WORKERS,
+                        help=f"Sub-sitemaps fetched in parallel (default: {SITEMAP_WORKERS})")
+    parser.add_argument("--sitemap-sample", type=int, default=SITEMAP_SAMPLE_SIZE,
+                        help=f"Size of the random sitemap URL sample (default: {SITEMAP_SAMPLE_SIZE})")
+    parser.add_argument("--liveness", type=parse_liveness_sample, default=0, metavar="N|all",
+                        help="HEAD-check N random sitemap URLs, or all of them (which keeps "
+                             "every URL in memory); default: off")
+    parser.add_argument("--liveness-deadline", type=float, default=LIVENESS_DEADLINE,
+                        help=f"Seconds allowed for the liveness sweep (default: {LIVENESS_DEADLINE})")
+    parser.add_argument("--liveness-rate", type=float, default=LIVENESS_RATE_PER_HOST,
+                        help="Liveness requests per second per host "
+                             f"(default: {LIVENESS_RATE_PER_HOST})")
+    parser.add_argument("--deadline", type=float,
+                        help="Overall time limit per site in seconds; unfinished sections "
+                             "are marked partial (default: none)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write every request and connection phase as JSON lines to FILE "
+                             "(with --bulk: every site's events, tagged with its URL under \"site\")")
+    parser.add_argument("--max-per-host", type=int, default=MAX_PER_HOST,
+                        help=f"Concurrent connections per host (default: {MAX_PER_HOST})")
+    parser.add_argument("--body-budget", action="append", default=[], metavar="TYPE=BYTES",
+                        help="Byte budget per resource type (html, robots, sitemap); "
+                             "0 means unlimited. Repeatable.")
+    parser.add_argument("--no-http-cache", action="store_true",
+                        help="Do not revalidate robots.txt/sitemaps against the on-disk cache")
+    parser.add_argument("--http-cache-dir", default=str(HTTP_CACHE_DIR),
+                        help=f"On-disk HTTP cache directory (default: {HTTP_CACHE_DIR})")
+    parser.add_argument("--http-cache-mb", type=int, default=HTTP_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="Size limit of the on-disk HTTP cache in MB "
+                             f"(default: {HTTP_CACHE_MAX_BYTES // (1024 * 1024)})")
+    parser.add_argument("--fingerprints",
+                        help="JSON technology fingerprint table to use instead of the built-in one")
     args = parser.parse_args()
 
-    data = collect(args.url)
+    collect_kwargs = {
+        "concurrent": not args.sequential,
+        "sitemap_url_budget": args.sitemap_url_budget,
+        "sitemap_workers": args.sitemap_workers,
+        "sitemap_sample_size": args.sitemap_sample,
+        "liveness_sample": args.liveness,
+        "liveness_deadline": args.liveness_deadline,
+        "liveness_rate": args.liveness_rate,
+        "deadline_s": args.deadline,
+    }
+    if not args.no_http_cache:
+        collect_kwargs["disk_cache"] = DiskCache(args.http_cache_dir, args.http_cache_mb * 1024 * 1024)
+    if args.body_budget:
+        collect_kwargs["body_budgets"] = parse_body_budgets(args.body_budget)
+    if args.fingerprints:
+        collect_kwargs["fingerprint_engine"] = FingerprintEngine(load_fingerprints(args.fingerprints))
+
+    if args.bulk:
+        print(f"Teaser Collector — bulk mode ({args.workers} workers)")
+        stats = collect_bulk(read_domains(args.url), args.output_file,
+                             workers=args.workers, max_per_host=args.max_per_host,
+                             trace_file=args.trace, **collect_kwargs)
+        print(f"\n  {stats['done']} collected, {stats['failed']} failed in {stats['elapsed_s']}s")
+        print(f"Data saved to {args.output_file}")
+        return
+
+    data = collect(args.url, max_per_host=args.max_per_host, trace=bool(args.trace),
+                   **collect_kwargs)
+    if args.trace:
+        with open(args.trace, "w") as f:
+            for event in data.pop("trace"):
+                f.write(json.dumps(event) + "\n")
 
     output_path = Path(args.output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -606,15 +2027,21 @@ def main():
 
     # Summary
     print()
-    print(f"  Robots: {'Found' if data['robots']['found'] else 'Not found'}")
+    print(f"  Robots: {'Found' if data['robots'].get('found') else 'Not found'}")
     if data["robots"].get("ai_crawler_blocks"):
         print(f"    AI crawler blocks: {len(data['robots']['ai_crawler_blocks'])}")
-    print(f"  Sitemap: {data['sitemap']['total_urls']} URLs")
+    print(f"  Sitemap: {data['sitemap'].get('total_urls', 0)} URLs")
+    if "liveness" in data:
+        live = data["liveness"]
+        print(f"    Liveness: {live['ok']}/{live['urls_checked']} OK, {live['redirects']} redirects,"
+              f" {live['not_found']} not found, {live['urls_skipped']} skipped")
     print(f"  Security grade: {data['security'].get('grade', 'N/A')}")
     print(f"  SSL: {'Valid' if data['ssl'].get('valid') else 'INVALID'}"
           f" (expires in {data['ssl'].get('days_until_expiry', '?')} days)")
     print(f"  Technology: CMS={data['technology'].get('cms', 'Unknown')}"
           f" CDN={data['technology'].get('cdn', 'Unknown')}")
+    timing = data["timing"]
+    print(f"  Timing: {timing['wall_s']}s, {timing['requests']} requests, {timing['bytes']:,} bytes")
     print(f"\nData saved to {output_path}")
 
 
@@ -0,0 +1,1074 @@
+"""
+Teaser Collector Transport — HTTP client and caches for teaser_collector.py
+Stdlib-only HTTP/1.1 layer shared by every probe of a teaser run:
+  - Session: keep-alive connection pool per host, per-host request limit,
+    body byte budgets, run deadline and HTTP(S)_PROXY/NO_PROXY support
+  - HostContext: one DNS lookup and a resumable TLS session per host
+  - ResponseCache: single-flight cache of buffered responses for one run
+  - DiskCache: conditional-GET cache of robots.txt and sitemaps across runs
+  - RunMetrics: per-probe request counts, body bytes and phase timings
+
+Bodies are decompressed as they are read (gzip and deflate, plus brotli
+when the optional `brotli` package is installed).
+"""
+
+import base64
+import contextvars
+import hashlib
+import http.client
+import json
+import os
+import socket
+import ssl
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zlib
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional — gzip/deflate are always supported
+    brotli = None
+
+USER_AGENT = "Mozilla/5.0 (compatible; AnalyticsAuditBot/1.0)"
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli else "gzip, deflate"
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+READ_CHUNK = 64 * 1024
+MAX_REDIRECTS = 10
+MAX_PER_HOST = 6
+DNS_TIMEOUT = 10
+
+# Persistent conditional-GET cache for robots.txt and sitemaps, kept next to
+# the GA4 audit credentials
+CONFIG_DIR = Path.home() / ".config" / "ga4-audit"
+HTTP_CACHE_DIR = CONFIG_DIR / "http-cache"
+HTTP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+REVALIDATE_RESOURCES = ("robots", "sitemap")
+
+# Default byte budgets per resource type; None means unlimited. HTML is
+# only needed for fingerprinting, and Google stops reading robots.txt
+# after 500 KiB. Sitemaps feed the streaming parser, which needs no cap.
+BODY_BUDGETS = {
+    "html": 2 * 1024 * 1024,
+    "robots": 512 * 1024,
+    "sitemap": None,
+}
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_CONTENT_TYPES = ("application/gzip", "application/x-gzip", "application/x-gunzip")
+
+
+def get_header(headers, name):
+    """Case-insensitive header lookup on a plain headers dict."""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+# --- HTTP transport ---
+
+class DecodedBody:
+    """File-like view of a response body with Content-Encoding removed.
+
+    Decompresses incrementally, so callers can stream it (e.g. into a
+    parser) without holding the compressed or inflated body in memory.
+    Each inflate step is capped at READ_CHUNK bytes of output, so a small
+    read never expands a highly compressed chunk all at once.
+    """
+
+    def __init__(self, raw, content_encoding=None):
+        self._raw = raw
+        self._buffer = b""
+        self._tail = b""
+        self._eof = False
+        encoding = (content_encoding or "").strip().lower()
+        if encoding in ("gzip", "x-gzip"):
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decoder = zlib.decompressobj()
+        elif encoding == "br" and brotli:
+            self._decoder = brotli.Decompressor()
+        else:
+            self._decoder = None
+
+    def _decode(self, chunk):
+        if self._decoder is None:
+            return chunk
+        if brotli and isinstance(self._decoder, brotli.Decompressor):
+            return self._decoder.process(chunk)
+        data = self._decoder.decompress(chunk, READ_CHUNK)
+        self._tail = self._decoder.unconsumed_tail
+        if self._decoder.eof and self._decoder.unused_data.startswith(GZIP_MAGIC):
+            # Concatenated gzip members (e.g. appended sitemap parts) restart the inflater
+            self._tail = self._decoder.unused_data
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return data
+
+    def _flush(self):
+        if self._decoder is None or not hasattr(self._decoder, "flush"):
+            return b""
+        return self._decoder.flush()
+
+    def read(self, size=-1):
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            if self._tail:
+                chunk, self._tail = self._tail, b""
+                self._buffer += self._decode(chunk)
+                continue
+            chunk = self._raw.read(READ_CHUNK)
+            if not chunk:
+                self._eof = True
+                self._buffer += self._flush()
+            else:
+                self._buffer += self._decode(chunk)
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    @property
+    def eof(self):
+        """True once the whole body has been returned by read()."""
+        return self._eof and not self._buffer and not self._tail
+
+
+class PrefixedStream:
+    """Replays bytes already read from a stream before reading the rest of it."""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size=-1):
+        if not self._prefix:
+            return self._stream.read(size)
+        if size is None or size < 0:
+            data, self._prefix = self._prefix + self._stream.read(), b""
+        else:
+            data, self._prefix = self._prefix[:size], self._prefix[size:]
+        return data
+
+
+class BoundedStream:
+    """Stream that stops after `limit` bytes, calling on_truncate if more remained."""
+
+    def __init__(self, stream, limit, on_truncate=None):
+        self._stream = stream
+        self._remaining = limit
+        self._on_truncate = on_truncate
+        self.truncated = False
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            if not self.truncated and self._stream.read(1):
+                self.truncated = True
+                if self._on_truncate:
+                    self._on_truncate()
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._stream.read(size)
+        self._remaining -= len(data)
+        if self._remaining <= 0:
+            self.read()  # probe one byte past the budget to detect truncation
+        return data
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run's global deadline passed before the operation could finish."""
+
+
+class DeadlineStream:
+    """Reads an http.client response one socket read at a time, up to the session deadline.
+
+    Before each read the socket timeout is cut to the time left, so a body
+    that trickles in slowly stops at the deadline instead of running past it.
+    """
+
+    def __init__(self, raw, conn, session):
+        self._raw = raw
+        self._conn = conn
+        self._session = session
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = []
+            while True:
+                chunk = self.read(READ_CHUNK)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+        remaining = self._session.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded("Run deadline exceeded")
+            if self._conn.sock is not None:
+                timeout = self._conn.timeout
+                self._conn.sock.settimeout(min(timeout, remaining) if timeout else remaining)
+        if self._raw.length == 0:
+            # read1() leaves a finished Content-Length body (or a HEAD/304)
+            # marked open; read() closes it so the connection can be pooled
+            return self._raw.read()
+        try:
+            return self._raw.read1(size)
+        except TimeoutError:
+            if self._session.expired():
+                raise DeadlineExceeded("Run deadline exceeded") from None
+            raise
+
+
+class Response:
+    """A single HTTP response from a Session.
+
+    The connection goes back to the pool on close() once the body has been
+    read to the end; a partially read body closes the connection instead.
+    Closing also frees the host's concurrency slot.
+    """
+
+    def __init__(self, session, key, conn, raw, url, slot, method="GET"):
+        self._session = session
+        self._key = key
+        self._conn = conn
+        self._raw = raw
+        self._slot = slot
+        self._method = method
+        self._stream = DeadlineStream(raw, conn, session)
+        self._wire = CountingStream(self._stream)
+        self._download_s = 0.0
+        self.url = url
+        self.status = raw.status
+        self.headers = dict(raw.headers)
+        self.body = DecodedBody(self._wire, raw.headers.get("Content-Encoding"))
+        self.from_cache = False
+        self._tee = None
+
+    def store_in(self, disk_cache):
+        """Copy the body into disk_cache as it is read (committed only if read to the end)."""
+        self._tee = self.body = CacheTee(self.body, disk_cache, self.url, self.status, self.headers)
+
+    def read(self, size=-1):
+        self._session.check_deadline()
+        start = time.perf_counter()
+        try:
+            return self.body.read(size)
+        finally:
+            self._download_s += time.perf_counter() - start
+
+    def close(self):
+        if self._tee is not None:
+            self._tee.abort()
+        if self._conn is None:
+            return
+        self._session.metrics.request(self._method, self.url, self.status, self._wire.count,
+                                      self._download_s)
+        try:
+            if not self._raw.isclosed():
+                # Drain small leftovers (e.g. redirect bodies) so the socket can be reused
+                self._stream.read(READ_CHUNK)
+        except Exception:
+            pass
+        if self._raw.isclosed():
+            self._session._release(self._key, self._conn)
+        else:
+            self._conn.close()
+        self._conn = None
+        self._slot.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ResponseCache:
+    """Request-scoped cache of buffered responses keyed by (method, url).
+
+    Single-flight: when two probes ask for the same URL at the same time,
+    the second waits for the first instead of fetching it again. Failures
+    are cached too, so a dead URL costs one timeout per run, not one per
+    analyzer.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, key, fetch):
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                entry.set_result(fetch())
+            except Exception as e:
+                entry.set_exception(e)
+        return entry.result()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+class HostLimiter:
+    """Caps concurrent open responses per hostname.
+
+    One limiter can be shared by several Sessions (bulk mode), so the cap
+    holds across every domain audited by the process.
+    """
+
+    def __init__(self, max_per_host=MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def slot(self, hostname):
+        with self._lock:
+            slot = self._slots.get(hostname)
+            if slot is None:
+                slot = self._slots[hostname] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+
+class CachedResponse:
+    """A Response replayed from the DiskCache after a 304 Not Modified."""
+
+    def __init__(self, url, entry, body_file):
+        self.url = url
+        self.status = entry["status"]
+        self.headers = entry["headers"]
+        self.body = body_file
+        self.from_cache = True
+
+    def read(self, size=-1):
+        return self.body.read(size)
+
+    def close(self):
+        self.body.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CacheTee:
+    """Copies a body stream into a DiskCache entry while it is being read.
+
+    The entry is committed once the body has been read to the end (an
+    empty read, or the wrapped stream reporting eof); a body abandoned or
+    cut off by a byte budget is discarded on abort().
+    """
+
+    def __init__(self, stream, disk_cache, url, status, headers):
+        self._stream = stream
+        self._cache = disk_cache
+        self._url = url
+        self._status = status
+        self._headers = headers
+        fd, self._tmp_path = tempfile.mkstemp(dir=disk_cache.directory, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        if self._file is not None:
+            if data:
+                self._file.write(data)
+            if not data or size is None or size < 0 or getattr(self._stream, "eof", False):
+                self._file.close()
+                self._file = None
+                self._cache.commit(self._url, self._status, self._headers, self._tmp_path)
+        return data
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            try:
+                os.unlink(self._tmp_path)
+            except OSError:
+                pass
+
+
+class DiskCache:
+    """Persistent HTTP cache revalidated with ETag / Last-Modified.
+
+    Only responses carrying a validator are stored. A later run sends
+    If-None-Match / If-Modified-Since and replays the stored body on a 304.
+    Bodies are stored decoded (after Content-Encoding), one file per URL,
+    and the cache is trimmed to max_bytes in least-recently-used order.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stores = 0
+        self.bytes_reused = 0
+        self._lock = threading.Lock()
+        self._index = None  # digest -> [last_used, size], loaded lazily
+
+    def _paths(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return digest, self.directory / f"{digest}.json", self.directory / f"{digest}.body"
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = {}
+            for body_path in self.directory.glob("*.body"):
+                try:
+                    st = body_path.stat()
+                except OSError:
+                    continue
+                self._index[body_path.stem] = [st.st_mtime, st.st_size]
+            # Apply a lowered size limit straight away, not only on the next store
+            self._evict()
+
+    def lookup(self, url):
+        """Stored entry for url ({url, status, headers, etag, last_modified}) or None."""
+        _, meta_path, body_path = self._paths(url)
+        try:
+            entry = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or not body_path.exists():
+            return None
+        return entry
+
+    def validators(self, entry):
+        """Conditional request headers for a stored entry."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def open_body(self, url, entry):
+        """Open a stored body for replay and mark it as recently used."""
+        digest, _, body_path = self._paths(url)
+        body_file = body_path.open("rb")
+        now = time.time()
+        try:
+            os.utime(body_path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self._load_index()
+            size = os.fstat(body_file.fileno()).st_size
+            self._index[digest] = [now, size]
+            self.hits += 1
+            self.bytes_reused += size
+        return body_file
+
+    def commit(self, url, status, headers, tmp_path):
+        """Move a fully read body into the cache and evict down to max_bytes."""
+        etag = get_header(headers, "ETag")
+        last_modified = get_header(headers, "Last-Modified")
+        if (not etag and not last_modified) or os.path.getsize(tmp_path) > self.max_bytes:
+            os.unlink(tmp_path)
+            return
+        digest, meta_path, body_path = self._paths(url)
+        stored_headers = {
+            k: v for k, v in headers.items()
+            if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        }
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": stored_headers,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        os.replace(tmp_path, body_path)
+        meta_tmp = meta_path.with_suffix(".json.part")
+        meta_tmp.write_text(json.dumps(entry))
+        os.replace(meta_tmp, meta_path)
+        with self._lock:
+            self._load_index()
+            self._index[digest] = [time.time(), body_path.stat().st_size]
+            self.stores += 1
+            self._evict()
+
+    def _evict(self):
+        total = sum(size for _, size in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for digest, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            for suffix in (".body", ".json"):
+                try:
+                    (self.directory / f"{digest}{suffix}").unlink()
+                except OSError:
+                    pass
+            del self._index[digest]
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "stores": self.stores, "bytes_reused": self.bytes_reused}
+
+
+# Probe (analyzer) the current thread works for; pools propagate it through
+# submit_in_context()
+CURRENT_PROBE = contextvars.ContextVar("probe", default="other")
+PHASES = ("dns", "connect", "tls", "ttfb", "download")
+
+
+def submit_in_context(pool, fn, *args, **kwargs):
+    """pool.submit() that runs fn in a copy of the caller's context (keeps CURRENT_PROBE)."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class RunMetrics:
+    """Per-probe request counts, body bytes and phase timings for one run.
+
+    Phases are DNS lookup, TCP connect, TLS handshake, time to first byte
+    (request sent until response headers) and body download. Each is
+    charged to the probe in CURRENT_PROBE. With trace=True every phase
+    and request is also kept as an event for --trace.
+    """
+
+    def __init__(self, trace=False):
+        self.started = time.perf_counter()
+        self.trace = [] if trace else None
+        self._probes = {}
+        self._lock = threading.Lock()
+
+    def _probe(self, name):
+        probe = self._probes.get(name)
+        if probe is None:
+            probe = self._probes[name] = {
+                "wall_ms": None, "requests": 0, "bytes": 0,
+                **{f"{phase}_ms": 0.0 for phase in PHASES},
+            }
+        return probe
+
+    def _event(self, event):
+        if self.trace is not None:
+            event["t_ms"] = round((time.perf_counter() - self.started) * 1000, 3)
+            event["probe"] = CURRENT_PROBE.get()
+            self.trace.append(event)
+
+    def phase(self, phase, seconds, **details):
+        """Charge `seconds` of `phase` to the current probe."""
+        with self._lock:
+            self._probe(CURRENT_PROBE.get())[f"{phase}_ms"] += seconds * 1000
+            self._event({"event": phase, "ms": round(seconds * 1000, 3), **details})
+
+    def request(self, method, url, status, nbytes, download_s):
+        """Count one finished network request of the current probe."""
+        with self._lock:
+            probe = self._probe(CURRENT_PROBE.get())
+            probe["requests"] += 1
+            probe["bytes"] += nbytes
+            probe["download_ms"] += download_s * 1000
+            self._event({"event": "request", "method": method, "url": url, "status": status,
+                         "bytes": nbytes, "download_ms": round(download_s * 1000, 3)})
+
+    def wall(self, name, seconds):
+        """Record a probe's wall-clock duration."""
+        with self._lock:
+            self._probe(name)["wall_ms"] = round(seconds * 1000, 1)
+            self._event({"event": "probe_done", "name": name, "ms": round(seconds * 1000, 3)})
+
+    def summary(self):
+        with self._lock:
+            probes = {
+                name: {k: round(v, 1) if isinstance(v, float) else v for k, v in probe.items()}
+                for name, probe in self._probes.items()
+            }
+        totals = {key: 0 for key in ("requests", "bytes")}
+        for probe in probes.values():
+            for key in totals:
+                totals[key] += probe[key]
+        return {
+            "wall_s": round(time.perf_counter() - self.started, 3),
+            **totals,
+            "probes": probes,
+        }
+
+
+class CountingStream:
+    """Counts the bytes read from a stream (the wire bytes of a body)."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self.count += len(data)
+        return data
+
+
+class HostContext:
+    """Connection state for one hostname, shared by the DNS, SSL and HTTP probes.
+
+    Resolves the host once (A and AAAA together) and dials every connection
+    from that result. Keeps the latest TLS session so later handshakes can
+    resume it. Records the certificate, cipher and protocol of the first
+    completed handshake, so analyze_ssl can report them without dialing.
+    """
+
+    def __init__(self, hostname, metrics=None):
+        self.hostname = hostname
+        self.metrics = metrics
+        self.tls_session = None
+        self.peer = None
+        self.stats = {"dns_lookups": 0, "tcp_connects": 0, "tls_handshakes": 0, "tls_resumed": 0}
+        self._addrinfo = None
+        self._handshakes_in_flight = 0
+        self._cond = threading.Condition()
+
+    def resolve(self, timeout=DNS_TIMEOUT):
+        """getaddrinfo() result for the host, looked up at most once.
+
+        getaddrinfo() itself cannot time out, so the lookup runs on a daemon
+        thread and callers wait at most `timeout` seconds for it.
+        """
+        with self._cond:
+            future = self._addrinfo
+            owner = future is None
+            if owner:
+                future = self._addrinfo = Future()
+                self.stats["dns_lookups"] += 1
+        if owner:
+            # Run in a copy of the caller's context so the lookup is charged to its probe
+            threading.Thread(target=contextvars.copy_context().run, args=(self._lookup, future),
+                             daemon=True, name=f"dns-{self.hostname}").start()
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"DNS lookup for {self.hostname} timed out") from None
+
+    def _lookup(self, future):
+        start = time.perf_counter()
+        try:
+            future.set_result(socket.getaddrinfo(self.hostname, None))
+        except Exception as e:
+            future.set_exception(e)
+        self._timed("dns", start)
+
+    def _timed(self, phase, start):
+        if self.metrics is not None:
+            self.metrics.phase(phase, time.perf_counter() - start, host=self.hostname)
+
+    def connect(self, port, timeout):
+        """Open a TCP connection to the first reachable resolved address."""
+        last_error = None
+        tried = set()
+        for family, _, _, _, sockaddr in self.resolve(timeout):
+            if family not in (socket.AF_INET, socket.AF_INET6) or sockaddr[0] in tried:
+                continue
+            tried.add(sockaddr[0])
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            start = time.perf_counter()
+            try:
+                sock.settimeout(timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.connect((sockaddr[0], port) + tuple(sockaddr[2:]))
+            except OSError as e:
+                sock.close()
+                last_error = e
+                continue
+            finally:
+                self._timed("connect", start)
+            with self._cond:
+                self.stats["tcp_connects"] += 1
+            return sock
+        raise last_error or OSError(f"No usable address for {self.hostname}")
+
+    def wrap_tls(self, sock, context):
+        """TLS handshake on sock, resuming the previous session when possible."""
+        with self._cond:
+            self._handshakes_in_flight += 1
+            tls_session = self.tls_session
+        start = time.perf_counter()
+        try:
+            ssock = context.wrap_socket(sock, server_hostname=self.hostname, session=tls_session)
+        except Exception:
+            self._timed("tls", start)
+            sock.close()
+            with self._cond:
+                self._handshakes_in_flight -= 1
+                self._cond.notify_all()
+            raise
+        self._timed("tls", start)
+        with self._cond:
+            self._handshakes_in_flight -= 1
+            self.stats["tls_handshakes"] += 1
+            if ssock.session_reused:
+                self.stats["tls_resumed"] += 1
+            if self.peer is None:
+                self.peer = {
+                    "cert": ssock.getpeercert(),
+                    "cipher": ssock.cipher(),
+                    "protocol": ssock.version(),
+                }
+            self.tls_session = ssock.session or self.tls_session
+            self._cond.notify_all()
+        return ssock
+
+    def remember_session(self, sock):
+        """Keep the TLS session of a finished connection (TLS 1.3 tickets arrive late)."""
+        session = getattr(sock, "session", None)
+        if session is not None:
+            with self._cond:
+                self.tls_session = session
+
+    def wait_for_peer(self, timeout):
+        """Peer details, waiting for a handshake already in progress; None if there is none."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.peer is not None or self._handshakes_in_flight == 0, timeout
+            )
+            return self.peer
+
+
+class HostHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that dials through a HostContext (the proxy's, when proxied)."""
+
+    def __init__(self, host_context, port, timeout):
+        super().__init__(host_context.hostname, port, timeout=timeout)
+        self.host_context = host_context
+
+    def connect(self):
+        self.sock = self.host_context.connect(self.port, self.timeout)
+
+
+class HostHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that dials and handshakes through a HostContext.
+
+    With a proxy (its HostContext, port and Proxy-Authorization value), the
+    connection is a CONNECT tunnel through the proxy and the TLS handshake
+    with the host runs inside it.
+    """
+
+    def __init__(self, host_context, port, timeout, context, proxy=None):
+        super().__init__(host_context.hostname, port, timeout=timeout, context=context)
+        self.host_context = host_context
+        self.proxy = proxy
+        if proxy is not None:
+            _, _, auth = proxy
+            self.set_tunnel(host_context.hostname, port,
+                            headers={"Proxy-Authorization": auth} if auth else None)
+
+    def connect(self):
+        if self.proxy is None:
+            sock = self.host_context.connect(self.port, self.timeout)
+        else:
+            proxy_context, proxy_port, _ = self.proxy
+            self.sock = proxy_context.connect(proxy_port, self.timeout)
+            self._tunnel()
+            sock = self.sock
+        self.sock = self.host_context.wrap_tls(sock, self._context)
+
+
+class Session:
+    """Per-run HTTP client with a pool of keep-alive connections per host.
+
+    Thread-safe: concurrent probes each take an idle connection for their
+    host (or open a new one) and hand it back when the response is closed.
+    At most max_per_host responses per hostname are open at once; further
+    requests wait for a slot. Buffered fetches go through a ResponseCache
+    shared by every analyzer. Bodies are read up to the byte budget of
+    their resource type (see BODY_BUDGETS); cut-off bodies are listed in
+    truncated_bodies. With a DiskCache, REVALIDATE_RESOURCES are fetched
+    with conditional GETs and replayed from disk when unchanged.
+
+    With a deadline (a time.monotonic() value), every timeout is cut to the
+    time left, and requests, handshakes and body reads raise
+    DeadlineExceeded once it has passed.
+
+    Requests go through the proxies urllib would use (HTTP_PROXY,
+    HTTPS_PROXY and NO_PROXY, or the system settings), unless `proxies`
+    maps schemes to proxy URLs explicitly. Plain HTTP is sent to the proxy
+    in absolute form; HTTPS is tunnelled with CONNECT.
+    """
+
+    def __init__(self, max_per_host=MAX_PER_HOST, max_idle_per_host=4, host_limiter=None,
+                 body_budgets=None, disk_cache=None, deadline=None, metrics=None,
+                 proxies=None):
+        self.max_idle_per_host = max_idle_per_host
+        self.proxies = urllib.request.getproxies() if proxies is None else proxies
+        self.deadline = deadline
+        self.metrics = metrics or RunMetrics()
+        self.disk_cache = disk_cache
+        self.host_limiter = host_limiter or HostLimiter(max_per_host)
+        self.body_budgets = {**BODY_BUDGETS, **(body_budgets or {})}
+        self.truncated_bodies = []
+        self.cache = ResponseCache()
+        self._hosts = {}
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def remaining(self):
+        """Seconds left before the deadline (0 once passed), or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check_deadline(self):
+        if self.expired():
+            raise DeadlineExceeded("Run deadline exceeded")
+
+    def timeout(self, timeout):
+        """timeout cut to the time left before the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise DeadlineExceeded("Run deadline exceeded")
+        return min(timeout, remaining) if timeout is not None else remaining
+
+    def host(self, hostname):
+        """The HostContext for hostname (created on first use)."""
+        with self._lock:
+            context = self._hosts.get(hostname)
+            if context is None:
+                context = self._hosts[hostname] = HostContext(hostname, self.metrics)
+            return context
+
+    def connection_stats(self):
+        """DNS lookups, TCP connects and TLS handshakes/resumptions across all hosts."""
+        with self._lock:
+            contexts = list(self._hosts.values())
+        totals = {"dns_lookups": 0, "tcp_connects": 0, "tls_handshakes": 0, "tls_resumed": 0}
+        for context in contexts:
+            for name, value in context.stats.items():
+                totals[name] += value
+        return totals
+
+    def _route(self, scheme, hostname, port):
+        """Pool key for a host: (scheme, hostname, port, proxy), proxy None when direct."""
+        return (scheme, hostname, port, self._proxy_for(scheme, hostname))
+
+    def _proxy_for(self, scheme, hostname):
+        """(host, port, Proxy-Authorization value) of the proxy for scheme, or None."""
+        proxy = self.proxies.get(scheme)
+        if not proxy or urllib.request.proxy_bypass(hostname):
+            return None
+        parts = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+        if not parts.hostname:
+            return None
+        auth = None
+        if parts.username is not None:
+            credentials = "{}:{}".format(urllib.parse.unquote(parts.username),
+                                         urllib.parse.unquote(parts.password or ""))
+            auth = "Basic " + base64.b64encode(credentials.encode()).decode("ascii")
+        return parts.hostname, parts.port or 80, auth
+
+    def tls_details(self, hostname, port=443, timeout=10):
+        """Certificate, cipher and protocol for hostname.
+
+        Reuses what the first HTTPS connection to the host captured, waiting
+        for a handshake already in flight. Otherwise it dials once and puts
+        the connection in the pool, so the HTTP probes reuse it.
+        """
+        timeout = self.timeout(timeout)
+        context = self.host(hostname)
+        peer = context.wait_for_peer(timeout)
+        if peer:
+            return peer
+        key = self._route("https", hostname, port)
+        conn, _ = self._acquire(key, timeout)
+        try:
+            if conn.sock is None:
+                conn.connect()
+        except Exception:
+            conn.close()
+            raise
+        self._release(key, conn)
+        return context.peer
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        scheme, host, port, proxy = key
+        if proxy is not None:
+            proxy_host, proxy_port, auth = proxy
+            proxy = (self.host(proxy_host), proxy_port, auth)
+        if scheme == "https":
+            conn = HostHTTPSConnection(self.host(host), port, timeout, self._ssl_context, proxy)
+        elif proxy is not None:
+            conn = HostHTTPConnection(proxy[0], proxy[1], timeout)
+        else:
+            conn = HostHTTPConnection(self.host(host), port, timeout)
+        return conn, False
+
+    def _release(self, key, conn):
+        if key[0] == "https" and conn.sock is not None:
+            self.host(key[1]).remember_session(conn.sock)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, headers=None, timeout=15, resource=None):
+        """Send one request (no redirect handling) and return a Response.
+
+        GETs of a REVALIDATE_RESOURCES type go through the disk cache, when
+        the session has one: a 304 returns a CachedResponse, and a fresh 200
+        is stored as it is read.
+        """
+        timeout = self.timeout(timeout)
+        cached = None
+        if self.disk_cache is not None and method == "GET" and resource in REVALIDATE_RESOURCES:
+            cached = self.disk_cache.lookup(url)
+            if cached:
+                headers = {**self.disk_cache.validators(cached), **(headers or {})}
+        resp = self._request(method, url, headers, timeout)
+        if cached and resp.status == 304:
+            resp.close()
+            return CachedResponse(url, cached, self.disk_cache.open_body(url, cached))
+        if resource in REVALIDATE_RESOURCES and self.disk_cache is not None and resp.status == 200:
+            resp.store_in(self.disk_cache)
+        return resp
+
+    def _request(self, method, url, headers, timeout):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = self._route(parts.scheme, parts.hostname, port)
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+
+        req_headers = {
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": ACCEPT_ENCODING,
+        }
+        proxy = key[3]
+        if parts.scheme == "http" and proxy is not None:
+            # Plain HTTP through a proxy: absolute-form request line
+            path = urllib.parse.urlunsplit((parts.scheme, parts.netloc.rpartition("@")[2],
+                                            parts.path or "/", parts.query, ""))
+            if proxy[2]:
+                req_headers["Proxy-Authorization"] = proxy[2]
+        req_headers.update(headers or {})
+
+        slot = self.host_limiter.slot(parts.hostname)
+        if not slot.acquire(timeout=self.remaining()):
+            raise DeadlineExceeded(f"Run deadline exceeded waiting for {parts.hostname}")
+        try:
+            conn, raw = self._send(key, method, path, req_headers, timeout)
+        except Exception:
+            slot.release()
+            raise
+        return Response(self, key, conn, raw, url, slot, method)
+
+    def _send(self, key, method, path, headers, timeout):
+        conn, reused = self._acquire(key, timeout)
+        try:
+            conn.request(method, path, headers=headers)
+            return conn, self._get_response(conn, key[1])
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+        except Exception:
+            conn.close()
+            raise
+        # The server dropped an idle keep-alive connection; retry on a fresh one
+        conn, _ = self._acquire_new(key, timeout)
+        try:
+            conn.request(method, path, headers=headers)
+            return conn, self._get_response(conn, key[1])
+        except Exception:
+            conn.close()
+            raise
+
+    def _get_response(self, conn, hostname):
+        start = time.perf_counter()
+        try:
+            return conn.getresponse()
+        finally:
+            self.metrics.phase("ttfb", time.perf_counter() - start, host=hostname)
+
+    def open(self, url, timeout=15, resource="sitemap"):
+        """Open a streaming GET that follows redirects, bypassing the run cache.
+
+        Used for large bodies (sitemaps) that should be parsed as they
+        arrive rather than buffered. The caller must close the Response.
+        """
+        for _ in range(MAX_REDIRECTS):
+            resp = self.request("GET", url, timeout=timeout, resource=resource)
+            location = get_header(resp.headers, "Location")
+            if resp.status in REDIRECT_CODES and location:
+                resp.close()
+                url = urllib.parse.urljoin(url, location)
+                continue
+            return resp
+        raise http.client.HTTPException(f"Too many redirects: {url}")
+
+    def limit_body(self, stream, url, resource):
+        """Wrap a body stream so it ends at the byte budget for `resource`."""
+        limit = self.body_budgets.get(resource)
+        if limit is None:
+            return stream
+        return BoundedStream(stream, limit, lambda: self._note_truncated(url, resource, limit))
+
+    def _note_truncated(self, url, resource, limit):
+        with self._lock:
+            self.truncated_bodies.append({"url": url, "resource": resource, "limit_bytes": limit})
+
+    def fetch(self, method, url, timeout=15, resource="html"):
+        """Buffered request through the run cache: returns (status, headers, body_text).
+
+        The body is read only up to the byte budget for `resource`.
+        """
+        def fetch_once():
+            with self.request(method, url, timeout=timeout, resource=resource) as resp:
+                body = self.limit_body(resp, url, resource).read()
+                return resp.status, resp.headers, body.decode("utf-8", errors="replace")
+
+        limit = self.body_budgets.get(resource)
+        return self.cache.get_or_fetch((method, url, limit), fetch_once)
+
+    def _acquire_new(self, key, timeout):
+        with self._lock:
+            for conn in self._idle.pop(key, []):
+                conn.close()
+        return self._acquire(key, timeout)
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()